@@ -0,0 +1,225 @@
+"""
+Encrypted on-disk Discord message cache.
+
+:author: Max Milazzo
+"""
+
+
+import json
+import sqlite3
+import threading
+from app.API.connection.record import MessageRecord, encode
+from app.crypto.symmetric import SKE, BLOCK_SIZE, BYTE_SIZE, KEY_SIZE
+from app.util.paths import MESSAGE_CACHE_PATH
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from typing import Union
+
+
+CACHE_RETENTION = 1000
+# maximum number of messages kept in the cache per Discord channel
+
+
+CACHE_KEY_INFO = b"CipherChat message cache"
+# key derivation context separating the cache key from the lock key
+
+
+class MessageCache:
+    """
+    SQLite message cache, encrypted with a key derived from the local lock key.
+    """
+
+    def __init__(
+        self, lock_key: bytes, path: str = MESSAGE_CACHE_PATH,
+        retention: int = CACHE_RETENTION
+    ) -> None:
+        """
+        Message cache initialization.
+
+        :param lock_key: local channel data lock key
+        :param path: cache database path
+        :param retention: maximum number of messages kept per Discord channel
+        """
+
+        self.key = HKDF(
+            algorithm=hashes.SHA256(), length=KEY_SIZE // BYTE_SIZE,
+            salt=None, info=CACHE_KEY_INFO
+        ).derive(lock_key)
+        # derive cache key
+
+        self.retention = retention
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # open database (shared between service threads)
+
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY, channel_id TEXT NOT NULL, data BLOB NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel_id, id);"
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "channel_id TEXT PRIMARY KEY, id INTEGER NOT NULL);"
+        )
+        # create tables (messages keyed by snowflake)
+
+
+    def _encrypt(self, message: MessageRecord) -> bytes:
+        """
+        Encrypts a message for storage.
+
+        :param message: message record
+        :return: IV and encrypted message bytes
+        """
+
+        cipher = SKE(key=self.key)
+        data = json.dumps(message, default=encode).encode("utf-8")
+
+        return cipher.iv + cipher.encrypt(data, byte_output=True)
+
+
+    def _decrypt(self, data: bytes) -> MessageRecord:
+        """
+        Decrypts a stored message.
+
+        :param data: IV and encrypted message bytes
+        :return: message record
+        """
+
+        iv_size = BLOCK_SIZE // BYTE_SIZE
+        cipher = SKE(key=self.key, iv=data[:iv_size])
+
+        return MessageRecord.from_dict(
+            json.loads(cipher.decrypt(data[iv_size:], byte_output=True))
+        )
+
+
+    def load(self, discord_cids: list) -> list:
+        """
+        Loads cached messages for Discord channels.
+
+        :param discord_cids: Discord channel IDs to load messages from
+        :return: list of cached messages (oldest first)
+        """
+
+        messages = []
+        unreadable = []
+        rewound = set()
+
+        with self._lock:
+            for discord_cid in discord_cids:
+                rows = self._db.execute(
+                    "SELECT id, data FROM messages WHERE channel_id = ? ORDER BY id",
+                    (str(discord_cid),)
+                ).fetchall()
+
+                for row_id, data in rows:
+                    try:
+                        messages.append(self._decrypt(data))
+
+                    except Exception:
+                        unreadable.append((row_id,))
+                        rewound.add(str(discord_cid))
+                        # entry written under a different lock key (such as
+                        # after a password reset)
+
+            if len(unreadable) > 0:
+                self._db.executemany("DELETE FROM messages WHERE id = ?", unreadable)
+                # drop entries that can no longer be decrypted
+
+                for discord_cid in rewound:
+                    newest = self._db.execute(
+                        "SELECT MAX(id) FROM messages WHERE channel_id = ?",
+                        (discord_cid,)
+                    ).fetchone()[0]
+
+                    if newest is None:
+                        self._db.execute(
+                            "DELETE FROM checkpoints WHERE channel_id = ?",
+                            (discord_cid,)
+                        )
+
+                    else:
+                        self._db.execute(
+                            "UPDATE checkpoints SET id = ? WHERE channel_id = ?",
+                            (newest, discord_cid)
+                        )
+                    # rewind checkpoint to the newest remaining entry (so
+                    # dropped messages are fetched again)
+
+                self._db.commit()
+
+        return messages
+
+
+    def checkpoint(self, discord_cid: str) -> Union[str, None]:
+        """
+        Retrieves the newest cached message ID for a Discord channel.
+
+        :param discord_cid: Discord channel ID
+        :return: newest cached message ID (or None if nothing is cached)
+        """
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM checkpoints WHERE channel_id = ?",
+                (str(discord_cid),)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return str(row[0])
+
+
+    def store(self, messages: list) -> None:
+        """
+        Stores messages, advances channel checkpoints, and applies retention.
+
+        :param messages: list of messages to store
+        """
+
+        if len(messages) == 0:
+            return
+
+        channels = {message["channel_id"] for message in messages}
+
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO messages (id, channel_id, data) VALUES (?, ?, ?)",
+                [
+                    (int(m["id"]), m["channel_id"], self._encrypt(m))
+                    for m in messages
+                ]
+            )
+            # store encrypted messages
+
+            for discord_cid in channels:
+                newest = max(
+                    int(m["id"]) for m in messages if m["channel_id"] == discord_cid
+                )
+
+                self._db.execute(
+                    "INSERT INTO checkpoints (channel_id, id) VALUES (?, ?) "
+                    "ON CONFLICT (channel_id) DO UPDATE SET id = MAX(id, excluded.id)",
+                    (discord_cid, newest)
+                )
+                # advance channel checkpoint
+
+                self._db.execute(
+                    "DELETE FROM messages WHERE channel_id = ? AND id NOT IN ("
+                    "SELECT id FROM messages WHERE channel_id = ? "
+                    "ORDER BY id DESC LIMIT ?)",
+                    (discord_cid, discord_cid, self.retention)
+                )
+                # drop messages beyond the retention limit
+
+            self._db.commit()
+
+
+    def close(self) -> None:
+        """
+        Closes the cache database.
+        """
+
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,181 @@
+"""
+Shared pooled HTTP client for Discord REST and CDN requests.
+
+:author: Max Milazzo
+"""
+
+
+import importlib.util
+import os
+import requests
+import threading
+from app.API.connection import ratelimit
+from requests.adapters import HTTPAdapter
+from typing import Any, Union
+
+
+POOL_CONNECTIONS = 4
+# number of distinct hosts to keep connection pools for (API, CDN, ...)
+
+
+POOL_MAXSIZE = 16
+# maximum number of kept-alive connections per host
+
+
+CONNECT_TIMEOUT = 5
+# connection establishment timeout (in seconds)
+
+
+READ_TIMEOUT = 30
+# response read timeout (in seconds)
+
+
+RATE_LIMIT_RETRIES = 5
+# maximum number of times a rate limited request is retried
+
+
+try:
+    import orjson as json
+    # use faster JSON decoder when installed
+
+except ImportError:
+    import json
+
+
+if importlib.util.find_spec("brotli") is not None:
+    ACCEPT_ENCODING = "gzip, deflate, br"
+    # accept brotli compressed responses when a brotli decoder is installed
+
+else:
+    ACCEPT_ENCODING = "gzip, deflate"
+    # otherwise only accept standard library decodable compression
+
+
+_session = None
+# global pooled session (created lazily within each process)
+
+
+_session_pid = None
+# ID of the process that created the global session
+
+
+_session_lock = threading.Lock()
+# lock guarding global session creation
+
+
+def session() -> requests.Session:
+    """
+    Retrieves the shared keep-alive session, creating it on first use.
+
+    :return: pooled HTTP session
+    """
+
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+        # sessions are not shared across process boundaries, so a forked
+        # service process creates a fresh connection pool of its own
+
+            new_session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
+            )
+            new_session.mount("https://", adapter)
+            new_session.mount("http://", adapter)
+            # configure connection pooling
+
+            new_session.headers.update({
+                "Accept-Encoding": ACCEPT_ENCODING,
+                "Connection": "keep-alive"
+            })
+            # configure compression and keep-alive
+
+            _session = new_session
+            _session_pid = os.getpid()
+
+        return _session
+
+
+def get(
+    url: str, headers: Union[dict, None] = None,
+    params: Union[dict, None] = None, route: Union[str, None] = None
+) -> requests.Response:
+    """
+    Makes a GET request using the shared session.
+
+    :param url: request URL
+    :param headers: additional request headers
+    :param params: request query parameters
+    :param route: rate limited API route (no rate limit handling if None)
+
+    :return: request response
+    """
+
+    for _ in range(RATE_LIMIT_RETRIES + 1):
+        if route is not None:
+            ratelimit.scheduler.acquire(route)
+            # wait for rate limit budget on the route
+
+        res = session().get(
+            url, headers=headers, params=params,
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+        )
+
+        if route is None:
+            return res
+
+        ratelimit.scheduler.update(route, res)
+        # record rate limit state reported by the response
+
+        if res.status_code != 429:
+            return res
+            # retry rate limited requests once the bucket resets
+
+    return res
+    # give up after repeated rate limiting (returning the 429 response)
+
+
+def get_json(
+    url: str, headers: Union[dict, None] = None,
+    params: Union[dict, None] = None, route: Union[str, None] = None
+) -> Any:
+    """
+    Makes a GET request using the shared session and parses the JSON body.
+
+    :param url: request URL
+    :param headers: additional request headers
+    :param params: request query parameters
+    :param route: rate limited API route (no rate limit handling if None)
+
+    :return: parsed response data
+    """
+
+    res = get(url, headers, params, route)
+
+    if not res.ok:
+        raise Exception(f"HTTP request failed with status {res.status_code}")
+        # do not treat error bodies as response data
+
+    return json.loads(res.content)
+    # parse raw response bytes directly (skipping intermediate text decoding)
+
+
+def get_bytes(url: str, headers: Union[dict, None] = None) -> bytes:
+    """
+    Makes a GET request using the shared session and returns the raw body.
+
+    :param url: request URL
+    :param headers: additional request headers
+
+    :return: response body bytes
+    """
+
+    res = get(url, headers)
+
+    if not res.ok:
+        raise Exception(f"HTTP request failed with status {res.status_code}")
+        # do not treat error bodies (such as from expired attachment URLs) as
+        # file data
+
+    return res.content
@@ -5,34 +5,76 @@ Discord message fetch requests.
 """
 
 
-import json
-import requests
+from app.API.connection import client
+from app.API.connection.record import MessageRecord
+from typing import Union
 
 
-FETCH_URL = "https://discord.com/api/v9/channels/{channel_id}/messages?limit={limit}"
+FETCH_URL = "https://discord.com/api/v9/channels/{channel_id}/messages"
 # Discord message fetch API URL
 
 
+FETCH_ROUTE = "channels/{channel_id}/messages"
+# Discord message fetch API rate limit route
+
+
 FETCH_MAX = 100
 # message fetch maximum count
 
 
-def get_messages(channel_id: str, auth: dict, limit: int = FETCH_MAX) -> list:
+def get_messages(
+    channel_id: str, auth: dict, limit: int = FETCH_MAX,
+    after: Union[str, None] = None, before: Union[str, None] = None
+) -> list:
     """
     Fetches messages from a Discord channel.
 
     :param channel_id: Discord channel ID
     :param auth: authorization headers for making requests to the Discord API
     :param limit: message fetch limit
+    :param after: only fetch messages newer than this message ID (if present)
+    :param before: only fetch messages older than this message ID (if present)
 
     :return: fetched message data
     """
 
-    res = requests.get(
-        FETCH_URL.format(channel_id=channel_id, limit=limit),
-        headers=auth
+    params = {"limit": limit}
+
+    if after is not None:
+        params["after"] = after
+        # only request messages following the passed snowflake cursor
+
+    if before is not None:
+        params["before"] = before
+        # only request messages preceding the passed snowflake cursor
+
+    messages = client.get_json(
+        FETCH_URL.format(channel_id=channel_id),
+        headers=auth, params=params,
+        route=FETCH_ROUTE.format(channel_id=channel_id)
     )
     # make Discord API request
 
-    return json.loads(res.text)
-    # format and return response data
\ No newline at end of file
+    return [MessageRecord.from_dict(message) for message in messages]
+    # keep only the message fields CipherChat uses
+
+
+def get_message(channel_id: str, message_id: str, auth: dict) -> Union[dict, None]:
+    """
+    Fetches a single message from a Discord channel by ID, regardless of how
+    far back in the channel history it is.
+
+    :param channel_id: Discord channel ID
+    :param message_id: Discord message ID
+    :param auth: authorization headers for making requests to the Discord API
+
+    :return: fetched message data (or None if not found)
+    """
+
+    messages = get_messages(
+        channel_id, auth, limit=1, after=str(int(message_id) - 1)
+    )
+    # the first message following the snowflake just before the requested ID
+    # is the requested message itself (if it exists)
+
+    return next((m for m in messages if m["id"] == message_id), None)
@@ -0,0 +1,316 @@
+"""
+Discord Gateway (WebSocket) push-based message receiver.
+
+:author: Max Milazzo
+"""
+
+
+import aiohttp
+import asyncio
+import platform
+import queue
+import random
+import threading
+from app.API.connection.record import MessageRecord
+
+
+GATEWAY_URL = "wss://gateway.discord.gg/?v=9&encoding=json"
+# Discord Gateway WebSocket URL
+
+
+GATEWAY_INTENTS = (1 << 9) | (1 << 12) | (1 << 15)
+# Gateway intents (guild messages, direct messages, and message content)
+
+
+RECONNECT_DELAY = 5
+# delay (in seconds) before reconnecting after a dropped Gateway connection
+
+
+OP_DISPATCH = 0
+OP_HEARTBEAT = 1
+OP_IDENTIFY = 2
+OP_RECONNECT = 7
+OP_INVALID_SESSION = 9
+OP_HELLO = 10
+OP_HEARTBEAT_ACK = 11
+# Gateway opcodes
+
+
+class Gateway:
+    """
+    Gateway receiver that collects MESSAGE_CREATE events for a set of Discord
+    channels on a background thread.
+    """
+
+    def __init__(
+        self, discord_cids: list, auth: dict, url: str = GATEWAY_URL, wake=None
+    ) -> None:
+        """
+        Gateway receiver initialization.
+
+        :param discord_cids: Discord channel IDs to receive messages from
+        :param auth: authorization headers for making requests to the Discord API
+        :param url: Gateway WebSocket URL (can point to a local stand-in)
+        :param wake: event to set when new messages are pushed
+        """
+
+        self.discord_cids = {str(discord_cid) for discord_cid in discord_cids}
+        self.token = auth["authorization"]
+        self.url = url
+        self.wake = wake
+
+        self.connected = False
+        # True while an identified Gateway session is active
+
+        self._messages = queue.Queue()
+        # pushed messages waiting to be collected
+
+        self._arrived = threading.Event()
+        # set whenever a message is pushed
+
+        self._resync = threading.Event()
+        # set on (re)connect so missed messages are caught up over REST
+
+        self._tasks = set()
+        # pending send tasks (referenced so they are not garbage collected
+        # before they run)
+
+        self._stopped = False
+        self._loop = None
+        self._ws = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+
+    def start(self) -> None:
+        """
+        Starts the background Gateway connection thread.
+        """
+
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        """
+        Stops the Gateway connection.
+        """
+
+        self._stopped = True
+
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+            # close active connection from the Gateway thread event loop
+
+
+    def resync_needed(self) -> bool:
+        """
+        Checks (and clears) whether a REST catch-up is needed because the
+        Gateway has (re)connected since the last check.
+
+        :return: True if a catch-up is needed, False otherwise
+        """
+
+        if self._resync.is_set():
+            self._resync.clear()
+            return True
+
+        return False
+
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits for a message to be pushed.
+
+        :param timeout: maximum wait time (in seconds)
+        :return: True if a message is waiting, False otherwise
+        """
+
+        return self._arrived.wait(timeout)
+
+
+    def drain(self) -> list:
+        """
+        Collects all pushed messages.
+
+        :return: list of pushed messages
+        """
+
+        self._arrived.clear()
+        messages = []
+
+        while True:
+            try:
+                messages.append(self._messages.get_nowait())
+
+            except queue.Empty:
+                return messages
+
+
+    def _run(self) -> None:
+        """
+        Gateway thread entry point.
+        """
+
+        asyncio.run(self._connect_loop())
+
+
+    async def _connect_loop(self) -> None:
+        """
+        Maintains the Gateway connection, reconnecting when it drops.
+        """
+
+        self._loop = asyncio.get_running_loop()
+
+        while not self._stopped:
+            try:
+                await self._session()
+
+            except Exception:
+                pass
+                # treat any connection failure as a dropped connection
+
+            self.connected = False
+            # fall back to polling while disconnected
+
+            if not self._stopped:
+                await asyncio.sleep(RECONNECT_DELAY)
+
+
+    async def _session(self) -> None:
+        """
+        Runs a single Gateway session until the connection drops.
+        """
+
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(self.url) as ws:
+                self._ws = ws
+                state = {"seq": None, "acked": True}
+                # last received sequence number and heartbeat acknowledgement
+
+                hello = await ws.receive_json()
+
+                if hello["op"] != OP_HELLO:
+                    return
+
+                heartbeat = asyncio.create_task(self._heartbeat(
+                    ws, hello["d"]["heartbeat_interval"] / 1000, state
+                ))
+                # start heartbeating at the interval requested by the Gateway
+
+                await ws.send_json({
+                    "op": OP_IDENTIFY,
+                    "d": {
+                        "token": self.token,
+                        "intents": GATEWAY_INTENTS,
+                        "properties": {
+                            "os": platform.system(),
+                            "browser": "CipherChat",
+                            "device": "CipherChat"
+                        }
+                    }
+                })
+                # identify session
+
+                try:
+                    async for ws_message in ws:
+                        if ws_message.type != aiohttp.WSMsgType.TEXT:
+                            break
+                            # connection closed or errored
+
+                        if not self._handle(ws_message.json(), ws, state):
+                            break
+                            # Gateway requested reconnect
+
+                finally:
+                    heartbeat.cancel()
+                    self._ws = None
+
+
+    def _handle(self, payload: dict, ws, state: dict) -> bool:
+        """
+        Handles a Gateway payload.
+
+        :param payload: Gateway payload
+        :param ws: Gateway WebSocket connection
+        :param state: session state
+
+        :return: False if the session should be reconnected, True otherwise
+        """
+
+        if payload.get("s") is not None:
+            state["seq"] = payload["s"]
+
+        op = payload["op"]
+
+        if op == OP_DISPATCH:
+            if payload["t"] == "READY":
+                self.connected = True
+                self._resync.set()
+                # session ready (catch up on anything missed while
+                # disconnected)
+
+            elif payload["t"] == "MESSAGE_CREATE":
+                message = payload["d"]
+
+                if message["channel_id"] in self.discord_cids:
+                    self._messages.put(MessageRecord.from_dict(message))
+                    self._arrived.set()
+                    # queue message from a monitored channel
+
+                    if self.wake is not None:
+                        self.wake.set()
+
+        elif op == OP_HEARTBEAT:
+            task = asyncio.create_task(
+                ws.send_json({"op": OP_HEARTBEAT, "d": state["seq"]})
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._forget)
+            # heartbeat requested by Gateway
+
+        elif op == OP_RECONNECT or op == OP_INVALID_SESSION:
+            return False
+            # reconnect requested or session invalidated
+
+        elif op == OP_HEARTBEAT_ACK:
+            state["acked"] = True
+
+        return True
+
+
+    def _forget(self, task: asyncio.Task) -> None:
+        """
+        Releases a finished send task.
+
+        :param task: finished send task
+        """
+
+        self._tasks.discard(task)
+
+        if not task.cancelled():
+            task.exception()
+            # a failed send means the connection dropped (handled by the
+            # session loop)
+
+
+    async def _heartbeat(self, ws, interval: float, state: dict) -> None:
+        """
+        Sends periodic heartbeats, closing the connection if one goes
+        unacknowledged.
+
+        :param ws: Gateway WebSocket connection
+        :param interval: heartbeat interval (in seconds)
+        :param state: session state
+        """
+
+        await asyncio.sleep(interval * random.random())
+        # offset first heartbeat as required by the Gateway
+
+        while True:
+            if not state["acked"]:
+                await ws.close()
+                return
+                # zombied connection
+
+            state["acked"] = False
+            await ws.send_json({"op": OP_HEARTBEAT, "d": state["seq"]})
+            await asyncio.sleep(interval)
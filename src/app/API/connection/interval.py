@@ -0,0 +1,93 @@
+"""
+Adaptive polling interval scheduling.
+
+:author: Max Milazzo
+"""
+
+
+import asyncio
+import random
+from typing import Union
+
+
+PING_SPEED_MAX = 10
+# default ceiling (in seconds) the polling interval backs off to when idle
+
+
+PING_BACKOFF = 1.5
+# default factor the polling interval grows by after each idle ping cycle
+
+
+PING_JITTER = 0.2
+# fraction of random variation applied to each polling delay
+
+
+class PollInterval:
+    """
+    Adaptive polling interval that backs off exponentially while channels are
+    idle and snaps back to the fast interval on activity.
+    """
+
+    def __init__(
+        self, minimum: float, polling: Union[dict, None] = None, wake=None
+    ) -> None:
+        """
+        Polling interval initialization.
+
+        :param minimum: default fast polling interval (in seconds)
+        :param polling: profile polling configuration, with optional "min",
+            "max", "backoff" and "jitter" values overriding the defaults
+        :param wake: event that can be set (from any thread or process) to
+            signal local activity, such as a sent message
+        """
+
+        if polling is None:
+            polling = {}
+
+        self.minimum = float(polling.get("min", minimum))
+        self.maximum = max(float(polling.get("max", PING_SPEED_MAX)), self.minimum)
+        self.backoff = float(polling.get("backoff", PING_BACKOFF))
+        self.jitter = float(polling.get("jitter", PING_JITTER))
+        # load profile tuning values (or defaults)
+
+        self.wake = wake
+        self.delay = self.minimum
+        # start at fast polling interval
+
+
+    def activity(self) -> None:
+        """
+        Snaps the interval back to the fast polling interval.
+        """
+
+        self.delay = self.minimum
+
+
+    def idle(self) -> None:
+        """
+        Backs off the interval after a ping cycle with no new messages.
+        """
+
+        self.delay = min(self.delay * self.backoff, self.maximum)
+
+
+    async def wait(self) -> None:
+        """
+        Waits for the current (jittered) interval, returning early and
+        snapping back to the fast interval if local activity is signaled.
+        """
+
+        delay = self.delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+        # spread out requests from clients that went idle at the same time
+
+        if self.wake is None:
+            await asyncio.sleep(delay)
+            return
+
+        woken = await asyncio.to_thread(self.wake.wait, delay)
+        # wait for either the interval to pass or a wake signal
+
+        if woken:
+            self.wake.clear()
+            self.activity()
+            # poll promptly after local activity
@@ -0,0 +1,249 @@
+"""
+Discord rate limit aware request scheduler.
+
+:author: Max Milazzo
+"""
+
+
+import json
+import threading
+import time
+from typing import Union
+
+
+RATE_LIMIT_MARGIN = 0
+# number of requests held back from each bucket before pacing begins
+
+
+DEFAULT_RETRY_AFTER = 1
+# fallback wait time (in seconds) when a rate limit response omits one
+
+
+class Bucket:
+    """
+    Rate limit bucket token accounting object.
+    """
+
+    def __init__(
+        self, limit: Union[int, None] = None, window: Union[float, None] = None
+    ) -> None:
+        """
+        Rate limit bucket initialization.
+
+        :param limit: number of requests allowed per window (unknown if None)
+        :param window: locally enforced window length in seconds (for routes
+            that do not report rate limit headers)
+        """
+
+        self.limit = limit
+        self.remaining = limit
+        self.window = window
+        self.reset_at = 0
+        # token state (filled in from response headers when available)
+
+        self.period = None
+        # longest reset interval reported by response headers (estimated
+        # window length for routes without a locally enforced window)
+
+
+    def refill(self, now: float) -> None:
+        """
+        Restores bucket tokens once its reset time has passed.
+
+        :param now: current monotonic time
+        """
+
+        if self.reset_at <= now and self.limit is not None:
+            self.remaining = self.limit
+            # bucket window has reset
+
+            period = self.window if self.window is not None else self.period
+
+            if period is not None:
+                self.reset_at = now + period
+                # start next window (so tokens are only restored once per
+                # window until a response reports the actual reset time)
+
+
+    def wait_time(self, now: float) -> float:
+        """
+        Calculates how long to wait before a request can be made.
+
+        :param now: current monotonic time
+        :return: wait time (in seconds)
+        """
+
+        if self.remaining is not None and self.remaining <= RATE_LIMIT_MARGIN:
+            return max(self.reset_at - now, 0)
+            # bucket exhausted until reset
+
+        return 0
+
+
+class Scheduler:
+    """
+    Central request scheduler that paces requests per rate limit bucket.
+    """
+
+    def __init__(self) -> None:
+        """
+        Scheduler initialization.
+        """
+
+        self._routes = {}
+        # route to bucket mapping (routes sharing a Discord bucket share a
+        # bucket object)
+
+        self._global_reset = 0
+        # time until which all requests are globally rate limited
+
+        self._lock = threading.Lock()
+        # lock guarding bucket state across request threads
+
+
+    def _bucket(
+        self, route: str, limit: Union[int, None] = None,
+        window: Union[float, None] = None
+    ) -> Bucket:
+        """
+        Retrieves the bucket for a route, creating it if needed.
+
+        :param route: request route
+        :param limit: locally enforced request limit for new buckets
+        :param window: locally enforced window length for new buckets
+
+        :return: route bucket
+        """
+
+        if route not in self._routes:
+            self._routes[route] = Bucket(limit, window)
+
+        return self._routes[route]
+
+
+    def acquire(
+        self, route: str, limit: Union[int, None] = None,
+        window: Union[float, None] = None
+    ) -> None:
+        """
+        Blocks until a request can be made on a route without exceeding its
+        rate limit, then consumes a request token.
+
+        :param route: request route
+        :param limit: locally enforced request limit (for routes without rate
+            limit headers)
+        :param window: locally enforced window length in seconds (for routes
+            without rate limit headers)
+        """
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                bucket = self._bucket(route, limit, window)
+                bucket.refill(now)
+                # restore tokens if the bucket has reset
+
+                wait = max(self._global_reset - now, bucket.wait_time(now))
+
+                if wait <= 0:
+                    if bucket.remaining is not None:
+                        bucket.remaining -= 1
+                        # consume request token
+
+                    return
+
+            time.sleep(wait)
+            # queue request until the bucket resets
+
+
+    def update(self, route: str, res) -> None:
+        """
+        Updates bucket state from a Discord API response.
+
+        :param route: request route
+        :param res: request response
+        """
+
+        headers = res.headers
+
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(route)
+
+            bucket_id = headers.get("X-RateLimit-Bucket")
+
+            if bucket_id is not None:
+                shared = next(
+                    (
+                        b for r, b in self._routes.items()
+                        if r != route and getattr(b, "id", None) == bucket_id
+                    ),
+                    None
+                )
+
+                if shared is not None:
+                    self._routes[route] = bucket = shared
+                    # routes reported under the same Discord bucket share
+                    # token accounting
+
+                bucket.id = bucket_id
+
+            if res.status_code == 429:
+                retry_after = headers.get("Retry-After")
+
+                try:
+                    retry_after = json.loads(res.content)["retry_after"]
+                    # prefer the (more precise) response body value
+
+                except Exception:
+                    pass
+
+                if retry_after is None:
+                    retry_after = DEFAULT_RETRY_AFTER
+
+                if headers.get("X-RateLimit-Global") is not None:
+                    self._global_reset = now + float(retry_after)
+                    # all requests are blocked by a global rate limit
+
+                else:
+                    bucket.remaining = 0
+                    bucket.reset_at = now + float(retry_after)
+                    # route bucket is blocked until retry time
+
+                return
+
+            if "X-RateLimit-Limit" in headers:
+                bucket.limit = int(headers["X-RateLimit-Limit"])
+
+            if "X-RateLimit-Remaining" in headers:
+                bucket.remaining = int(headers["X-RateLimit-Remaining"])
+
+            if "X-RateLimit-Reset-After" in headers:
+                reset_after = float(headers["X-RateLimit-Reset-After"])
+                bucket.reset_at = now + reset_after
+                bucket.period = max(bucket.period or 0, reset_after)
+            # set bucket state from rate limit headers
+
+
+    def stats(self) -> dict:
+        """
+        Reports the remaining request budget of each known route.
+
+        :return: route rate limit statistics
+        """
+
+        with self._lock:
+            now = time.monotonic()
+
+            return {
+                route: {
+                    "limit": bucket.limit,
+                    "remaining": bucket.remaining,
+                    "reset_after": max(bucket.reset_at - now, 0),
+                    "global_reset_after": max(self._global_reset - now, 0)
+                } for route, bucket in self._routes.items()
+            }
+
+
+scheduler = Scheduler()
+# global request scheduler
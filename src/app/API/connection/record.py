@@ -0,0 +1,173 @@
+"""
+Compact Discord message and attachment records.
+
+:author: Max Milazzo
+"""
+
+
+from typing import Any, Union
+
+
+class AttachmentRecord:
+    """
+    Compact Discord message attachment record.
+    """
+
+    __slots__ = ("id", "filename", "url", "size")
+    # only the attachment fields used by CipherChat are kept
+
+
+    @staticmethod
+    def from_dict(data: dict) -> "AttachmentRecord":
+        """
+        Builds an attachment record from Discord attachment data.
+
+        :param data: Discord attachment data dictionary
+        :return: attachment record
+        """
+
+        return AttachmentRecord(
+            data["id"], data["filename"], data["url"], data.get("size", 0)
+        )
+
+
+    def __init__(self, id: str, filename: str, url: str, size: int) -> None:
+        """
+        Attachment record initialization.
+
+        :param id: Discord attachment ID
+        :param filename: attachment filename
+        :param url: attachment CDN URL
+        :param size: attachment size (in bytes)
+        """
+
+        self.id = id
+        self.filename = filename
+        self.url = url
+        self.size = size
+
+
+    def __getitem__(self, key: str) -> Any:
+        """
+        Dictionary style field access (for compatibility with raw Discord data).
+
+        :param key: field name
+        :return: field value
+        """
+
+        return getattr(self, key)
+
+
+    def to_dict(self) -> dict:
+        """
+        Converts the record to a dictionary.
+
+        :return: attachment data dictionary
+        """
+
+        return {
+            "id": self.id, "filename": self.filename, "url": self.url,
+            "size": self.size
+        }
+
+
+class MessageRecord:
+    """
+    Compact Discord message record.
+    """
+
+    __slots__ = ("id", "channel_id", "timestamp", "content", "attachments")
+    # only the message fields used by CipherChat are kept
+
+
+    @staticmethod
+    def from_dict(data: dict) -> "MessageRecord":
+        """
+        Builds a message record from Discord message data.
+
+        :param data: Discord message data dictionary
+        :return: message record
+        """
+
+        return MessageRecord(
+            data["id"], data["channel_id"], data["timestamp"], data["content"],
+            [
+                None if attachment is None else AttachmentRecord.from_dict(attachment)
+                for attachment in data["attachments"]
+            ]
+        )
+
+
+    def __init__(
+        self, id: str, channel_id: str, timestamp: str, content: str,
+        attachments: list
+    ) -> None:
+        """
+        Message record initialization.
+
+        :param id: Discord message ID
+        :param channel_id: Discord channel ID
+        :param timestamp: message timestamp (ISO 8601)
+        :param content: message content
+        :param attachments: list of attachment records (None flagged entries
+            mark removed oversized message data files)
+        """
+
+        self.id = id
+        self.channel_id = channel_id
+        self.timestamp = timestamp
+        self.content = content
+        self.attachments = attachments
+
+
+    def __getitem__(self, key: str) -> Any:
+        """
+        Dictionary style field access (for compatibility with raw Discord data).
+
+        :param key: field name
+        :return: field value
+        """
+
+        return getattr(self, key)
+
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """
+        Dictionary style field assignment.
+
+        :param key: field name
+        :param value: field value
+        """
+
+        setattr(self, key, value)
+
+
+    def to_dict(self) -> dict:
+        """
+        Converts the record to a dictionary.
+
+        :return: message data dictionary
+        """
+
+        return {
+            "id": self.id, "channel_id": self.channel_id,
+            "timestamp": self.timestamp, "content": self.content,
+            "attachments": [
+                None if attachment is None else attachment.to_dict()
+                for attachment in self.attachments
+            ]
+        }
+
+
+def encode(record: Union[MessageRecord, AttachmentRecord]) -> dict:
+    """
+    JSON serialization hook for records (for use as "json.dumps" default).
+
+    :param record: message or attachment record
+    :return: record data dictionary
+    """
+
+    if isinstance(record, (MessageRecord, AttachmentRecord)):
+        return record.to_dict()
+
+    raise TypeError(f"Object of type {type(record).__name__} is not JSON serializable")
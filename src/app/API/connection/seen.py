@@ -0,0 +1,146 @@
+"""
+Bounded previously seen message index.
+
+:author: Max Milazzo
+"""
+
+
+from collections import deque
+from typing import Union
+
+
+SEEN_MAX = 10000
+# maximum number of message IDs held in the seen message index
+
+
+class SeenIndex:
+    """
+    Constant time, fixed memory index of previously seen Discord messages.
+    """
+
+    def __init__(self, capacity: int = SEEN_MAX) -> None:
+        """
+        Seen message index initialization.
+
+        :param capacity: maximum number of message IDs to hold
+        """
+
+        self.capacity = capacity
+
+        self._ids = set()
+        # seen message IDs (for constant time lookup)
+
+        self._order = deque()
+        # ring buffer of (Discord channel ID, message ID) in insertion order
+        # (for eviction)
+
+        self._high_water = {}
+        # newest seen message ID (snowflake) for each Discord channel
+
+        self._floor = {}
+        # newest evicted message ID for each Discord channel (anything at or
+        # below it is treated as seen)
+
+
+    def add(self, message: dict) -> bool:
+        """
+        Adds a message to the index.
+
+        :param message: message data dictionary
+        :return: True if the message had not been seen before, False otherwise
+        """
+
+        message_id = message["id"]
+        discord_cid = message["channel_id"]
+        snowflake = int(message_id)
+
+        if message_id in self._ids or snowflake <= self._floor.get(discord_cid, -1):
+            return False
+            # message already seen
+
+        self._ids.add(message_id)
+        self._order.append((discord_cid, message_id))
+        # record message
+
+        if snowflake > self._high_water.get(discord_cid, -1):
+            self._high_water[discord_cid] = snowflake
+            # advance channel high-water mark
+
+        if len(self._order) > self.capacity:
+            old_cid, old_id = self._order.popleft()
+            self._ids.discard(old_id)
+            # evict oldest recorded message
+
+            self._floor[old_cid] = max(self._floor.get(old_cid, -1), int(old_id))
+            # raise channel floor so evicted messages still read as seen
+
+        return True
+
+
+    def filter(self, messages: list) -> list:
+        """
+        Adds messages to the index, keeping only those not seen before.
+
+        :param messages: list of messages
+        :return: list of previously unseen messages
+        """
+
+        return [message for message in messages if self.add(message)]
+
+
+    def seek(self, discord_cid: str, message_id: Union[str, None]) -> None:
+        """
+        Marks every message up to an ID in a Discord channel as seen.
+
+        :param discord_cid: Discord channel ID
+        :param message_id: message ID (nothing is marked if None)
+        """
+
+        if message_id is None:
+            return
+
+        discord_cid = str(discord_cid)
+        snowflake = int(message_id)
+
+        self._floor[discord_cid] = max(self._floor.get(discord_cid, -1), snowflake)
+        self._high_water[discord_cid] = max(
+            self._high_water.get(discord_cid, -1), snowflake
+        )
+        # advance channel floor and high-water mark
+
+
+    def cursor(self, discord_cid: str) -> Union[str, None]:
+        """
+        Retrieves the newest seen message ID for a Discord channel.
+
+        :param discord_cid: Discord channel ID
+        :return: newest seen message ID (or None if none seen)
+        """
+
+        snowflake = self._high_water.get(str(discord_cid))
+
+        if snowflake is None:
+            return None
+
+        return str(snowflake)
+
+
+    def __contains__(self, message_id: str) -> bool:
+        """
+        Checks whether a message ID is currently held in the index.
+
+        :param message_id: message ID
+        :return: True if held, False otherwise
+        """
+
+        return message_id in self._ids
+
+
+    def __len__(self) -> int:
+        """
+        Number of message IDs currently held in the index.
+
+        :return: index size
+        """
+
+        return len(self._ids)
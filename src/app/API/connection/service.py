@@ -5,93 +5,323 @@ Basic Discord message scanning service.
 """
 
 
+import asyncio
 import time
-from app.API.connection import fetch
+from app.API.connection import fetch, snowflake
+from app.API.connection.gateway import Gateway
+from app.API.connection.interval import PollInterval
+from app.API.connection.seen import SeenIndex
+from app.util import log
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Coroutine, Generator, Union
 
 
 PING_SPEED = 1
-# delay (in seconds) between checks for new messages
+# fast delay (in seconds) between checks for new messages
 
 
 FETCH_DELAY = 0
 # delay between consecutive fetch requests within a ping cycle
 
 
+FETCH_CONCURRENCY = 8
+# maximum number of Discord channels fetched from concurrently
+
+
 kill_flag = False
 # global flag that can be set to terminate the read loop.
 
 
-def read_history(discord_cids: list, auth: dict) -> list:
+def run(coro: Coroutine) -> Any:
+    """
+    Runs a service coroutine to completion on a new event loop, with a
+    fetch worker pool sized to the fetch concurrency limit.
+
+    :param coro: service coroutine to run
+    :return: coroutine result
+    """
+
+    async def main() -> Any:
+        """
+        Service event loop entry point.
+
+        :return: coroutine result
+        """
+
+        with ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY) as executor:
+            asyncio.get_running_loop().set_default_executor(executor)
+            return await coro
+
+    return asyncio.run(main())
+
+
+async def fetch_channels(func: callable, discord_cids: list) -> list:
+    """
+    Concurrently runs a blocking fetch function for each Discord channel.
+
+    :param func: fetch function taking a Discord channel ID
+    :param discord_cids: Discord channel IDs to fetch from
+
+    :return: fetch results (in the same order as the Discord channel IDs)
+    """
+
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    # bound the number of requests in flight at once
+
+    async def fetch_channel(discord_cid: str) -> Any:
+        """
+        Runs the fetch function for a single Discord channel.
+
+        :param discord_cid: Discord channel ID to fetch from
+        :return: fetch result
+        """
+
+        async with semaphore:
+            result = await asyncio.to_thread(func, discord_cid)
+            # run blocking request off of the event loop
+
+            await asyncio.sleep(FETCH_DELAY)
+            # space out consecutive requests made through this slot
+
+        return result
+
+    return await asyncio.gather(
+        *(fetch_channel(discord_cid) for discord_cid in discord_cids)
+    )
+
+
+def stream_history(
+    discord_cids: list, auth: dict, depth: Union[int, None] = None,
+    since: Union[float, None] = None
+) -> Generator[list, None, None]:
+    """
+    Lazily retrieves the message history for the specified Discord channels,
+    paging backwards from the newest message one fetch at a time.
+
+    :param discord_cids: Discord channel IDs to retrieve message history from
+    :param auth: authorization headers for making requests to the Discord API
+    :param depth: maximum number of messages to retrieve per channel (no limit
+        if None)
+    :param since: epoch timestamp of the oldest message to retrieve (no limit
+        if None)
+
+    :return: generator yielding batches of messages (newest first, per channel)
+    """
+
+    for discord_cid in discord_cids:
+        cursor = None
+        remaining = depth
+
+        while remaining is None or remaining > 0:
+            limit = fetch.FETCH_MAX
+
+            if remaining is not None:
+                limit = min(limit, remaining)
+                # avoid fetching past the depth bound
+
+            page = fetch.get_messages(discord_cid, auth, limit, before=cursor)
+            # fetch the page preceding the cursor
+
+            if since is not None:
+                floor = int(snowflake.cursor(since))
+                batch = [message for message in page if int(message["id"]) >= floor]
+                # drop messages older than the time bound
+                
+            else:
+                batch = page
+
+            if len(batch) > 0:
+                yield batch
+
+            if len(batch) < limit:
+                break
+                # stop at the start of the channel or once the time bound is
+                # reached
+
+            if remaining is not None:
+                remaining -= len(batch)
+
+            cursor = min(page, key=lambda message: int(message["id"]))["id"]
+            time.sleep(FETCH_DELAY)
+            # move cursor back to the oldest message of the page
+
+
+def read_history(
+    discord_cids: list, auth: dict, depth: int = fetch.FETCH_MAX
+) -> list:
     """
     Retrieves the message history for the specified Discord channels.
 
     :param discord_cids: Discord channel IDs to retrieve message history from
     :param auth: authorization headers for making requests to the Discord API
+    :param depth: maximum number of messages to retrieve per channel
 
     :return: list of messages retrieved from the specified channels
     """
     
     history = []
+
+    results = run(fetch_channels(
+        lambda discord_cid: [
+            message for batch in stream_history([discord_cid], auth, depth)
+            for message in batch
+        ],
+        discord_cids
+    ))
+    # fetch from all channels concurrently
     
-    for channel_id in discord_cids:
-        history.extend(fetch.get_messages(channel_id, auth))
+    for channel_msgs in results:
+        history.extend(channel_msgs)
         # add messages to chat history log
-
-        time.sleep(FETCH_DELAY)
         
     return history
 
 
-def read_loop(log: list, discord_cids: list, auth: dict, func: callable) -> None:
+def newest_id(messages: list) -> Union[str, None]:
     """
-    Monitors Discord channels for new messages, invoking a provided callable
-    function on them when found.
+    Finds the most recent message ID (snowflake) in a list of messages.
 
-    :param log: list to store previously seen messages
+    :param messages: list of messages to search
+    :return: most recent message ID (or None if no messages passed)
+    """
+
+    if len(messages) == 0:
+        return None
+
+    return max(messages, key=lambda message: int(message["id"]))["id"]
+    # snowflake IDs increase over time, so the largest ID is the newest
+
+
+def read_new(discord_cid: str, auth: dict, cursor: Union[str, None]) -> list:
+    """
+    Retrieves every message newer than a snowflake cursor from a Discord
+    channel, paginating when more than a single fetch worth has arrived.
+
+    :param discord_cid: Discord channel ID to fetch messages from
+    :param auth: authorization headers for making requests to the Discord API
+    :param cursor: most recently seen message ID (or None if none seen yet)
+
+    :return: list of messages newer than the cursor
+    """
+
+    if cursor is None:
+        return fetch.get_messages(discord_cid, auth)
+        # no messages seen yet, so everything currently in channel is new
+
+    new_msgs = []
+
+    while True:
+        page = fetch.get_messages(discord_cid, auth, after=cursor)
+        new_msgs.extend(page)
+        # fetch messages following the cursor
+
+        if len(page) < fetch.FETCH_MAX:
+            break
+            # stop once a partial page shows no more messages are waiting
+
+        cursor = newest_id(page)
+        time.sleep(FETCH_DELAY)
+        # advance cursor to continue from the end of the full page
+
+    return new_msgs
+
+
+def poll(discord_cid: str, auth: dict, cursor: Union[str, None]) -> list:
+    """
+    Polls a Discord channel for new messages, treating failed requests as
+    having found nothing so the channel is simply retried next ping cycle.
+
+    :param discord_cid: Discord channel ID to fetch messages from
+    :param auth: authorization headers for making requests to the Discord API
+    :param cursor: most recently seen message ID (or None if none seen yet)
+
+    :return: list of messages newer than the cursor
+    """
+
+    try:
+        return read_new(discord_cid, auth, cursor)
+
+    except Exception as e:
+        log.error("POLL ERROR", {
+            "DISCORD CHANNEL": discord_cid,
+            "CURSOR": cursor
+        }, e)
+        # log poll errors
+
+        return []
+        # skip channel for this ping cycle on request failure
+
+
+async def _read_loop(
+    history: list, discord_cids: list, auth: dict, func: callable,
+    polling: Union[dict, None], wake, gateway: Union[Gateway, None],
+    cursors: Union[dict, None]
+) -> None:
+    """
+    Asynchronous read loop implementation (see "read_loop").
+
+    :param history: list of previously seen messages
     :param discord_cids: Discord channel IDs to monitor
     :param auth: authorization headers for making requests to the Discord API
     :param func: a callable function that processes new messages
+    :param polling: profile polling interval configuration
+    :param wake: event signaling local activity
+    :param gateway: Gateway push receiver (if used)
+    :param cursors: checkpoint message IDs to resume from
     """
 
     global kill_flag
 
+    seen = SeenIndex()
+    seen.filter(history)
+    # index previously seen messages, tracking the newest seen message ID
+    # (snowflake) for each Discord channel
+
+    if cursors is not None:
+        for discord_cid, message_id in cursors.items():
+            seen.seek(discord_cid, message_id)
+            # resume from checkpoints
+
+    interval = PollInterval(PING_SPEED, polling, wake)
+    # adaptive delay between ping cycles
+
     while True:
         if kill_flag:
             kill_flag = False
             return
             # halt scanning loop when global kill flag set to true
 
-        new_msgs = []
-        
-        for discord_cid in discord_cids:
-            fetch_num = 0
-            
-            while True:
-                test_msgs = fetch.get_messages(
-                    discord_cid, auth, fetch_num + 1
-                )
-                # fetch recent messages
-                
-                if len(test_msgs) <= fetch_num:
-                    new_msgs.extend(test_msgs)
-                    fetch_num = 0
-                    break
-                    # special case for if fewer messages found than the passed limit
-
-                test_msg_id = test_msgs[fetch_num]["id"]
-                # extract most recent fetched message ID
-                
-                if any(item["id"] == test_msg_id for item in log):
-                    break
-                    # break loop if most recent fetched message (matched by ID)
-                    # has already been seen
-                
-                fetch_num += 1
-                time.sleep(FETCH_DELAY)
-                
-            if fetch_num > 0:
-                new_msgs.extend(test_msgs[:-1])
-                # add newly fetched messages to new message list
+        pushed = (
+            gateway is not None and gateway.connected and
+            not gateway.resync_needed()
+        )
+        # use pushed messages while the Gateway is connected (unless a
+        # catch-up is needed after a reconnect)
+
+        if pushed:
+            await asyncio.to_thread(gateway.wait, PING_SPEED)
+            fetched = gateway.drain()
+            # collect pushed messages
+
+        else:
+            results = await fetch_channels(
+                lambda discord_cid: poll(discord_cid, auth, seen.cursor(discord_cid)),
+                discord_cids
+            )
+            # fetch all messages newer than each channel cursor concurrently
+
+            fetched = [
+                message for channel_msgs in results for message in channel_msgs
+            ]
+
+            if gateway is not None:
+                fetched.extend(gateway.drain())
+                # include anything pushed during catch-up (duplicates are
+                # dropped by the seen message index)
+
+        new_msgs = seen.filter(fetched)
+        # record newly fetched messages (advancing channel cursors) and drop
+        # any already seen
                 
         if len(new_msgs) > 0:
             halt_flag = func(new_msgs)
@@ -101,7 +331,42 @@ def read_loop(log: list, discord_cids: list, auth: dict, func: callable) -> None
                 return
                 # if message processing function returns a true halt flag, halt scanning
 
-            log.extend(new_msgs)
-            # add new messages to the message log
-            
-        time.sleep(PING_SPEED)
\ No newline at end of file
+            interval.activity()
+            # poll quickly while a conversation is active
+
+        else:
+            interval.idle()
+            # back off while channels are quiet
+
+        if not pushed:
+            await interval.wait()
+
+
+def read_loop(
+    history: list, discord_cids: list, auth: dict, func: callable,
+    polling: Union[dict, None] = None, wake=None,
+    gateway: Union[Gateway, None] = None, cursors: Union[dict, None] = None
+) -> None:
+    """
+    Monitors Discord channels for new messages, invoking a provided callable
+    function on them when found.
+
+    :param history: list of previously seen messages (new messages are
+        tracked in a bounded index rather than appended here)
+    :param discord_cids: Discord channel IDs to monitor
+    :param auth: authorization headers for making requests to the Discord API
+    :param func: a callable function that processes new messages
+    :param polling: profile polling interval configuration (see
+        "PollInterval")
+    :param wake: event that can be set to signal local activity (such as a
+        sent message) and trigger an immediate fast poll
+    :param gateway: started Gateway push receiver to take messages from while
+        connected (REST polling is used as a fallback while disconnected)
+    :param cursors: Discord channel ID to checkpoint message ID mapping;
+        everything up to each checkpoint is treated as already seen
+    """
+
+    run(_read_loop(
+        history, discord_cids, auth, func, polling, wake, gateway, cursors
+    ))
+    # run read loop on the service event loop
@@ -0,0 +1,121 @@
+"""
+Discord snowflake ID utilities.
+
+:author: Max Milazzo
+"""
+
+
+import heapq
+from datetime import datetime, timezone
+from typing import Union
+
+
+DISCORD_EPOCH = 1420070400000
+# Discord epoch (first second of 2015) in milliseconds
+
+
+TIMESTAMP_SHIFT = 22
+# bit offset of the millisecond timestamp within a snowflake
+
+
+def timestamp(snowflake: Union[str, int]) -> float:
+    """
+    Extracts the creation time encoded in a snowflake.
+
+    :param snowflake: snowflake ID
+    :return: epoch timestamp (in seconds)
+    """
+
+    return ((int(snowflake) >> TIMESTAMP_SHIFT) + DISCORD_EPOCH) / 1000
+
+
+def to_datetime(snowflake: Union[str, int]) -> datetime:
+    """
+    Extracts the creation time encoded in a snowflake as a UTC datetime.
+
+    :param snowflake: snowflake ID
+    :return: creation datetime
+    """
+
+    return datetime.fromtimestamp(timestamp(snowflake), tz=timezone.utc)
+
+
+def cursor(epoch_timestamp: float) -> str:
+    """
+    Builds a snowflake cursor for a point in time (usable as an "after" or
+    "before" fetch bound).
+
+    :param epoch_timestamp: epoch timestamp (in seconds)
+    :return: lowest snowflake ID created at the timestamp
+    """
+
+    return str(max(int(epoch_timestamp * 1000) - DISCORD_EPOCH, 0) << TIMESTAMP_SHIFT)
+
+
+def key(message: dict) -> int:
+    """
+    Message ordering key (snowflakes increase over time).
+
+    :param message: message data dictionary
+    :return: message snowflake
+    """
+
+    return int(message["id"])
+
+
+def ordered(messages: list) -> list:
+    """
+    Puts a single stream of messages (such as one channel's fetched pages)
+    into oldest first order.
+
+    Discord returns pages newest first, so pre-sorted streams are reversed
+    in linear time and only unordered streams are fully sorted.
+
+    :param messages: list of messages
+    :return: list of messages, oldest first
+    """
+
+    ids = [key(message) for message in messages]
+
+    if all(ids[i] < ids[i + 1] for i in range(len(ids) - 1)):
+        return messages
+        # already oldest first
+
+    if all(ids[i] > ids[i + 1] for i in range(len(ids) - 1)):
+        return messages[::-1]
+        # newest first
+
+    return sorted(messages, key=key)
+
+
+def merge(streams: list) -> list:
+    """
+    Merges message streams into a single oldest first list using a k-way
+    heap merge.
+
+    :param streams: list of message lists (each in any consistent order)
+    :return: merged list of messages, oldest first
+    """
+
+    return list(heapq.merge(*(ordered(stream) for stream in streams), key=key))
+
+
+def sort(messages: list) -> list:
+    """
+    Orders messages from multiple Discord channels, oldest first, by merging
+    the (pre-sorted) per-channel streams.
+
+    :param messages: list of messages
+    :return: list of messages, oldest first
+    """
+
+    streams = {}
+
+    for message in messages:
+        streams.setdefault(message["channel_id"], []).append(message)
+        # split into per-channel streams (preserving fetch order)
+
+    if len(streams) == 1:
+        return ordered(messages)
+
+    return merge(list(streams.values()))
@@ -6,38 +6,260 @@ Basic Discord message post transmission.
 
 
 import io
+import json
+import secrets
+from app.API.connection import client, ratelimit
 from app.util.media import ATTACHMENT_IDENT
-from discord import File, SyncWebhook
+from discord import SyncWebhook
 
 
 TEXT_LIMIT = 2000
 # standard-sized transmission character limit
 
 
-def send(ident: str, text: str, webhook: SyncWebhook, attachment_files: list = []) -> None:
+WEBHOOK_LIMIT = 5
+# webhook transmissions allowed per rate limit window
+
+
+WEBHOOK_WINDOW = 2
+# webhook rate limit window length (in seconds)
+
+
+UPLOAD_TIMEOUT = 300
+# maximum time (in seconds) to wait for a response once an upload is sent
+
+
+SEND_RETRIES = 5
+# maximum number of times a rate limited transmission is sent again
+
+
+class MultipartStream(io.RawIOBase):
+    """
+    Read-only, forward-only multipart/form-data request body that reads file
+    parts as it is sent, so attachment data is never held in memory whole.
+    """
+
+    def __init__(self, fields: list, boundary: str) -> None:
+        """
+        Multipart stream initialization.
+
+        :param fields: list of (part headers, part data) pairs, where part data
+            is bytes or a sized file object
+        :param boundary: multipart boundary string
+        """
+
+        super().__init__()
+
+        self._parts = []
+        # ordered body parts (bytes or file objects)
+
+        for headers, data in fields:
+            self._parts.append(
+                f"--{boundary}\r\n{headers}\r\n\r\n".encode("utf-8")
+            )
+            self._parts.append(data)
+            self._parts.append(b"\r\n")
+
+        self._parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+
+        self.size = sum(MultipartStream.part_size(p) for p in self._parts)
+        # total body size (declared as the request content length)
+
+        self._position = 0
+
+
+    @staticmethod
+    def part_size(part) -> int:
+        """
+        Calculates the size of a body part.
+
+        :param part: bytes or file object
+        :return: part size (in bytes)
+        """
+
+        if isinstance(part, bytes) or hasattr(part, "__len__"):
+            return len(part)
+
+        return len(part.getbuffer())
+        # in-memory file
+
+
+    def readable(self) -> bool:
+        """
+        Reports that the stream can be read.
+
+        :return: True
+        """
+
+        return True
+
+
+    def tell(self) -> int:
+        """
+        Reports the stream position.
+
+        :return: stream position
+        """
+
+        return self._position
+
+
+    def __len__(self) -> int:
+        """
+        Reports the total body size.
+
+        :return: body size (in bytes)
+        """
+
+        return self.size
+
+
+    def readinto(self, buffer) -> int:
+        """
+        Reads body data into a buffer.
+
+        :param buffer: writable buffer
+        :return: number of bytes read (0 at the end of the body)
+        """
+
+        while len(self._parts) > 0:
+            part = self._parts[0]
+
+            if isinstance(part, bytes):
+                data = part[:len(buffer)]
+                self._parts[0] = part[len(data):]
+
+            else:
+                data = part.read(len(buffer))
+
+            if len(data) == 0:
+                self._parts.pop(0)
+                continue
+                # part exhausted
+
+            buffer[:len(data)] = data
+            self._position += len(data)
+
+            return len(data)
+
+        return 0
+
+
+    def close(self) -> None:
+        """
+        Closes the stream and any unsent file parts.
+        """
+
+        for part in self._parts:
+            if not isinstance(part, bytes):
+                part.close()
+
+        self._parts = []
+        super().close()
+
+
+def upload(text: str, webhook: SyncWebhook, attachment_files: list) -> bool:
+    """
+    Sends a message with attachments via webhook, streaming attachment data as
+    the request body is sent.
+
+    :param text: message content
+    :param webhook: the webhook where the message is being sent
+    :param attachment_files: list of (filename, file object) encrypted
+        attachment files
+
+    :return: True if sent, False if rate limited
+    """
+
+    boundary = secrets.token_hex(16)
+    payload = {
+        "content": text,
+        "attachments": [
+            {"id": i, "filename": filename}
+            for i, (filename, _) in enumerate(attachment_files)
+        ]
+    }
+
+    fields = [(
+        'Content-Disposition: form-data; name="payload_json"\r\n'
+        "Content-Type: application/json",
+        json.dumps(payload).encode("utf-8")
+    )]
+
+    for i, (filename, data) in enumerate(attachment_files):
+        fields.append((
+            f'Content-Disposition: form-data; name="files[{i}]"; '
+            f'filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream",
+            data
+        ))
+    # build webhook execute form (matching discord.py's request layout)
+
+    body = MultipartStream(fields, boundary)
+    route = f"webhooks/{webhook.id}"
+
+    try:
+        res = client.session().post(
+            webhook.url, data=body, headers={
+                "Content-Type": f"multipart/form-data; boundary={boundary}"
+            }, timeout=(client.CONNECT_TIMEOUT, UPLOAD_TIMEOUT)
+        )
+        # stream request body (sent with a fixed content length)
+
+    finally:
+        body.close()
+
+    ratelimit.scheduler.update(route, res)
+    # record rate limit state reported by the response
+
+    if res.status_code == 429:
+        return False
+
+    if not res.ok:
+        raise Exception(f"Webhook send failed with status {res.status_code}")
+
+    return True
+
+
+def send(
+    ident: str, text: str, webhook: SyncWebhook, attachment_files: list = []
+) -> bool:
     """
     Sends messages via webhook to Discord channel.
 
     :param ident: message identifier
     :param text: message body text
     :param webhook: the webhook where the message is being sent
-    :param attachment_files: list of loaded encrypted attachment files
+    :param attachment_files: list of (filename, file object) encrypted
+        attachment files
+
+    :return: True if sent, False if rate limited (attachment files are
+        consumed either way, so a retry must encode them again)
     """
 
     transmission = ident + "\n" + text
     # construct transmission text
 
     if len(transmission) > TEXT_LIMIT:
-        attachment_files.insert(0,
-            File(
-                io.BytesIO(transmission.encode("utf-8")),
-                filename="data.txt"
-            )
-        )
-        # set message data attachment file as primary (first) attachment file
+        attachment_files = [
+            ("data.txt", io.BytesIO(text.encode("utf-8")))
+        ] + attachment_files
+        # set message body attachment file as primary (first) attachment file
+
+        transmission = ident + "\n" + ATTACHMENT_IDENT
+        # keep identifier in message content (so receivers can skip the
+        # download) followed by oversized transmission identification
+
+    ratelimit.scheduler.acquire(
+        f"webhooks/{webhook.id}", WEBHOOK_LIMIT, WEBHOOK_WINDOW
+    )
+    # pace transmissions to stay under the webhook rate limit
+
+    if len(attachment_files) > 0:
+        return upload(transmission, webhook, attachment_files)
+        # stream attachments (discord.py builds multipart bodies in memory)
 
-        transmission = ATTACHMENT_IDENT
-        # set message content to oversized transmission identification
+    webhook.send(transmission)
+    # send transmission
 
-    webhook.send(transmission, files=attachment_files)
-    # send transmission
\ No newline at end of file
+    return True
@@ -0,0 +1,5 @@
+"""
+Local service daemon module.
+
+:author: Max Milazzo
+"""
\ No newline at end of file
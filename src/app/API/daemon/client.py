@@ -0,0 +1,215 @@
+"""
+Local service daemon client.
+
+:author: Max Milazzo
+"""
+
+
+import json
+import os
+import socket
+import threading
+from app.API.connection.record import MessageRecord
+from app.util.paths import DAEMON_SOCKET_PATH
+from typing import Generator, Union
+
+
+_conn = None
+# global persistent (connection, reader) pair reused across requests
+
+
+_conn_pid = None
+# ID of the process that opened the persistent connection
+
+
+_conn_lock = threading.Lock()
+# lock guarding the persistent connection (one request in flight at a time)
+
+
+def connect() -> Union[socket.socket, None]:
+    """
+    Connects to the local service daemon.
+
+    :return: daemon connection (or None if no daemon is running)
+    """
+
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(DAEMON_SOCKET_PATH):
+        return None
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        conn.connect(DAEMON_SOCKET_PATH)
+        return conn
+
+    except OSError:
+        conn.close()
+        return None
+        # stale socket file (daemon not running)
+
+
+def available() -> bool:
+    """
+    Checks whether the local service daemon is running.
+
+    :return: True if the daemon is running, False otherwise
+    """
+
+    conn = connect()
+
+    if conn is None:
+        return False
+
+    conn.close()
+    return True
+
+
+def _send(conn: socket.socket, request: dict) -> None:
+    """
+    Sends a request to the daemon.
+
+    :param conn: daemon connection
+    :param request: request payload
+    """
+
+    conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+
+
+def _close() -> None:
+    """
+    Closes the persistent request connection.
+
+    Must be called while holding the connection lock.
+    """
+
+    global _conn
+
+    if _conn is not None and _conn_pid == os.getpid():
+        conn, f = _conn
+        f.close()
+        conn.close()
+
+    _conn = None
+
+
+def request(payload: dict) -> dict:
+    """
+    Makes a single request to the daemon over the persistent connection.
+
+    :param payload: request payload (see "server.RequestHandler")
+    :return: daemon response
+    """
+
+    global _conn, _conn_pid
+
+    with _conn_lock:
+        for _ in range(2):
+            if _conn is None or _conn_pid != os.getpid():
+            # connections are not shared across process boundaries
+
+                conn = connect()
+
+                if conn is None:
+                    _conn = None
+                    raise Exception("Daemon: not running")
+
+                _conn = (conn, conn.makefile("rb"))
+                _conn_pid = os.getpid()
+
+            conn, f = _conn
+
+            try:
+                _send(conn, payload)
+                line = f.readline()
+
+                if line != b"":
+                    return json.loads(line)
+
+            except OSError:
+                pass
+
+            _close()
+            # connection dropped (daemon restarted), so retry once on a new
+            # connection (requests are idempotent)
+
+    raise Exception("Daemon: connection lost")
+
+
+def history(message_filter: dict) -> list:
+    """
+    Retrieves cached messages from the daemon.
+
+    :param message_filter: subscription filter (see "server.matches")
+    :return: list of matching messages
+    """
+
+    messages = request({"op": "history", "filter": message_filter})["messages"]
+    return [MessageRecord.from_dict(message) for message in messages]
+
+
+def get_message(discord_cid: str, message_id: str) -> Union[dict, None]:
+    """
+    Retrieves a single message through the daemon.
+
+    :param discord_cid: Discord channel ID
+    :param message_id: Discord message ID
+
+    :return: message data (or None if not found)
+    """
+
+    message = request({
+        "op": "message", "channel_id": str(discord_cid), "message_id": message_id
+    })["message"]
+
+    if message is None:
+        return None
+
+    return MessageRecord.from_dict(message)
+
+
+def wake() -> bool:
+    """
+    Signals local activity to the daemon so it promptly polls for new messages.
+
+    :return: True if a running daemon was signaled, False otherwise
+    """
+
+    try:
+        request({"op": "wake"})
+        return True
+
+    except Exception:
+        return False
+        # no daemon running
+
+
+def subscribe(message_filter: dict) -> Generator[list, None, None]:
+    """
+    Subscribes to messages from the daemon.
+
+    :param message_filter: subscription filter (see "server.matches")
+
+    :return: generator yielding the cached message history first, then
+        batches of new messages (empty batches are yielded periodically while
+        idle so callers can check for shutdown)
+    """
+
+    conn = connect()
+
+    if conn is None:
+        raise Exception("Daemon: not running")
+
+    with conn, conn.makefile("rb") as f:
+        _send(conn, {"op": "subscribe", "filter": message_filter})
+
+        while True:
+            line = f.readline()
+
+            if line == b"":
+                return
+                # daemon stopped
+
+            yield [
+                MessageRecord.from_dict(message)
+                for message in json.loads(line)["messages"]
+            ]
@@ -0,0 +1,297 @@
+"""
+Local service daemon that owns Discord fetching for a profile and serves
+message subscriptions over a Unix socket.
+
+:author: Max Milazzo
+"""
+
+
+import atexit
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+from app.API.connection import fetch, service, snowflake
+from app.API.connection import record
+from app.API.connection.gateway import Gateway
+from app.util.media import Attachment
+from app.util.paths import DAEMON_SOCKET_PATH
+from collections import OrderedDict
+from typing import Union
+
+
+CACHE_MAX = 5000
+# maximum number of messages held in the daemon message cache
+
+
+SUBSCRIBER_TIMEOUT = 1
+# interval (in seconds) at which idle subscriptions are sent keep-alive lines
+
+
+cache = OrderedDict()
+# global message cache (message ID to message, in order received)
+
+
+cache_lock = threading.Lock()
+# lock guarding the message cache and subscriber list
+
+
+subscribers = []
+# global list of (message filter, message queue) subscriptions
+
+
+def matches(message: dict, message_filter: dict) -> bool:
+    """
+    Checks whether a message matches a subscription filter.
+
+    :param message: message data dictionary
+    :param message_filter: filter with optional "idents" (list of accepted
+        message content start strings) and "channel" (app channel ID the
+        message header must name) values
+
+    :return: True if the message matches, False otherwise
+    """
+
+    content = message["content"]
+    idents = message_filter.get("idents")
+
+    if idents is not None and not any(content.startswith(i) for i in idents):
+        return False
+        # message type not subscribed to
+
+    channel_id = message_filter.get("channel")
+
+    if channel_id is not None:
+        header = content.split("\n", 1)[0]
+
+        if header.rsplit(" ", 1)[-1] != channel_id:
+            return False
+            # message header names a different app channel
+
+    return True
+
+
+def add(messages: list) -> None:
+    """
+    Resolves, caches and distributes newly fetched messages.
+
+    :param messages: list of new messages
+    """
+
+    messages = snowflake.sort(messages)
+    # keep cache in message order
+
+    Attachment.prefetch(messages, lambda header: False)
+    # start downloading legacy oversized message bodies
+
+    for message in messages:
+        try:
+            Attachment.message_handler(message, lambda header: False)
+            # resolve legacy oversized messages once for every subscriber
+            # (others keep their header visible, so subscribers download only
+            # the data for channels they display)
+
+        except Exception:
+            pass
+            # leave unresolved (subscribers will skip it)
+
+    with cache_lock:
+        for message in messages:
+            cache[message["id"]] = message
+
+            if len(cache) > CACHE_MAX:
+                cache.popitem(last=False)
+                # evict oldest cached message
+
+        for message_filter, message_queue in subscribers:
+            selected = [m for m in messages if matches(m, message_filter)]
+
+            if len(selected) > 0:
+                message_queue.put(selected)
+                # distribute matching messages to subscriber
+
+
+def history(message_filter: dict) -> list:
+    """
+    Retrieves cached messages matching a filter.
+
+    :param message_filter: subscription filter (see "matches")
+    :return: list of matching cached messages
+    """
+
+    with cache_lock:
+        return [m for m in cache.values() if matches(m, message_filter)]
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Daemon client connection handler.
+
+    Connections may carry any number of requests (a subscription takes over
+    the connection until the client disconnects). Each request is a single
+    JSON line with an "op" value of:
+        "history"   - replies with cached messages matching "filter"
+        "subscribe" - replies with cached messages matching "filter", then
+                      streams new matching messages (one JSON line per batch)
+        "message"   - replies with the message specified by "channel_id" and
+                      "message_id" (fetched from Discord, with current
+                      attachment URLs)
+        "wake"      - signals local activity (such as a sent message) so new
+                      messages are promptly polled for
+    """
+
+    def send(self, payload: dict) -> None:
+        """
+        Sends a JSON line to the client.
+
+        :param payload: payload to send
+        """
+
+        self.wfile.write(
+            json.dumps(payload, default=record.encode).encode("utf-8") + b"\n"
+        )
+        self.wfile.flush()
+
+
+    def handle(self) -> None:
+        """
+        Handles client requests until the client disconnects.
+        """
+
+        try:
+            for line in self.rfile:
+                self.respond(json.loads(line))
+                # serve requests over a persistent connection
+
+        except OSError:
+            pass
+            # client disconnected
+
+
+    def respond(self, request: dict) -> None:
+        """
+        Handles a client request.
+
+        :param request: request payload
+        """
+
+        message_filter = request.get("filter", {})
+
+        if request["op"] == "history":
+            self.send({"messages": history(message_filter)})
+
+        elif request["op"] == "message":
+            self.send({"message": fetch.get_message(
+                request["channel_id"], request["message_id"], self.server.auth
+            )})
+            # always refetch (cached attachment URLs are signed and expire
+            # long before the daemon stops)
+
+        elif request["op"] == "wake":
+            self.server.wake.set()
+            self.send({})
+
+        elif request["op"] == "subscribe":
+            message_queue = queue.Queue()
+            subscription = (message_filter, message_queue)
+
+            with cache_lock:
+                messages = [
+                    m for m in cache.values() if matches(m, message_filter)
+                ]
+                subscribers.append(subscription)
+                # snapshot history and register subscription atomically so no
+                # messages are missed or repeated
+
+            try:
+                self.send({"messages": messages})
+
+                while True:
+                    try:
+                        messages = message_queue.get(timeout=SUBSCRIBER_TIMEOUT)
+
+                    except queue.Empty:
+                        messages = []
+                        # keep-alive (lets clients check for shutdown)
+
+                    self.send({"messages": messages})
+
+            except OSError:
+                pass
+                # client disconnected
+
+            finally:
+                with cache_lock:
+                    subscribers.remove(subscription)
+
+
+def cleanup() -> None:
+    """
+    Removes the daemon socket file.
+    """
+
+    if os.path.exists(DAEMON_SOCKET_PATH):
+        os.remove(DAEMON_SOCKET_PATH)
+
+
+def serve(
+    discord_cids: list, auth: dict, polling: Union[dict, None] = None,
+    push: bool = False
+) -> None:
+    """
+    Runs the service daemon.
+
+    :param discord_cids: Discord channel IDs to fetch messages from
+    :param auth: authorization headers for making requests to the Discord API
+    :param polling: profile polling interval configuration
+    :param push: receive messages over the Discord Gateway
+    """
+
+    if not hasattr(socket, "AF_UNIX"):
+        raise Exception("Daemon: Unix sockets are not supported on this platform")
+
+    cleanup()
+    # remove stale socket left by a previous run (so clients fetch directly
+    # until the daemon is ready)
+
+    gateway = None
+
+    if push:
+        gateway = Gateway(discord_cids, auth)
+        gateway.start()
+        # connect Gateway push receiver
+
+    messages = service.read_history(discord_cids, auth)
+    add(messages)
+    # fetch and cache initial message history
+
+    umask = os.umask(0o177)
+    # create the socket accessible to the current user only (so no other user
+    # can make authenticated requests through the daemon, even briefly)
+
+    try:
+        server = socketserver.ThreadingUnixStreamServer(
+            DAEMON_SOCKET_PATH, RequestHandler
+        )
+
+    finally:
+        os.umask(umask)
+
+    server.daemon_threads = True
+    server.auth = auth
+    server.wake = threading.Event()
+    # initialize socket server (only once history is cached, so connecting
+    # clients are served immediately)
+
+    atexit.register(cleanup)
+    # remove socket on exit
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # start serving clients
+
+    service.read_loop(
+        messages, discord_cids, auth, add, polling, server.wake, gateway
+    )
+    # fetch and distribute new messages
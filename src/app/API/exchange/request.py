@@ -9,12 +9,12 @@ import random
 import threading
 import time
 import uuid
-from app.API.connection import service, transmit
+from app.API.connection import service, snowflake, transmit
+from app.API.daemon import client as daemon
 from app.API.exchange import response
 from app.API.exchange.packets import AKERequestDecoder, AKERequestEncoder, REQUEST_IDENT
 from app.crypto.asymmetric import AKE
-from app.util.paths import ERROR_LOG_PATH
-from datetime import datetime
+from app.util import log
 
 
 REQUEST_EXPIRE = 600
@@ -31,8 +31,13 @@ def scan(discord_cids: list, auth: dict) -> dict:
     :return: active join requests
     """
     
-    messages = service.read_history(discord_cids, auth)
-    # fetch message history
+    if daemon.available():
+        messages = daemon.history({"idents": [REQUEST_IDENT]})
+        # fetch cached message history from local service daemon
+
+    else:
+        messages = service.read_history(discord_cids, auth)
+        # fetch message history
 
     requests = {}
 
@@ -41,7 +46,7 @@ def scan(discord_cids: list, auth: dict) -> dict:
             continue
             # skip message if it isn't identified as a request
         
-        server_timestamp = datetime.fromisoformat(message["timestamp"])
+        server_timestamp = snowflake.to_datetime(message["id"])
         time_diff = time.time() - server_timestamp.timestamp()
         # calculate request time offset
         
@@ -61,14 +66,11 @@ def scan(discord_cids: list, auth: dict) -> dict:
             # store decoded request data 
             
         except Exception as e:
-            with open(ERROR_LOG_PATH, "a") as f:
-                f.write(
-                    "[REQUEST SCAN ERROR]\n" +
-                    f'MESSAGE           : "{message["content"]}"\n' +
-                    f'TIMESTAMP         : "{message["timestamp"]}"\n' +
-                    f"(ERROR) {e}\n\n"
-                )
-                # log request scan errors
+            log.error("REQUEST SCAN ERROR", {
+                "MESSAGE": message["content"],
+                "TIMESTAMP": message["timestamp"]
+            }, e)
+            # log request scan errors
             
     return requests
 
@@ -114,5 +116,11 @@ def send(
     # select random viable webhook
     
     header = request.header(request_id)
-    transmit.send(header, request.encode(), webhook)
-    # transmit channel join request
\ No newline at end of file
+    encoded = request.encode()
+
+    for _ in range(transmit.SEND_RETRIES + 1):
+        if transmit.send(header, encoded, webhook):
+            return
+            # transmit channel join request (again if rate limited)
+
+    raise Exception("Join request not sent (webhook rate limit retries exhausted)")
\ No newline at end of file
@@ -6,10 +6,11 @@ Key exchange invite (join response) API functions.
 
 
 import random
-from app.API.connection import service, transmit
+from app.API.connection import service, snowflake, transmit
+from app.API.daemon import client as daemon
 from app.API.exchange.packets import AKEResponseDecoder, AKEResponseEncoder, RESPONSE_IDENT
 from app.util.channel import Channel
-from app.util.paths import ERROR_LOG_PATH
+from app.util import log
 
 
 def join_func_factory(
@@ -34,7 +35,7 @@ def join_func_factory(
         :return: service read loop kill flag status (False)
         """
 
-        for message in sorted(messages, key=lambda message: message["timestamp"]):
+        for message in snowflake.sort(messages):
             try:
                 if not message["content"].startswith(RESPONSE_IDENT):
                     continue
@@ -57,14 +58,11 @@ def join_func_factory(
                     # execute custom channel creation callback function
 
             except Exception as e:
-                with open(ERROR_LOG_PATH, "a") as f:
-                    f.write(
-                        "[INVITE SCAN ERROR]\n" +
-                        f'MESSAGE           : "{message["content"]}"\n' +
-                        f'TIMESTAMP         : "{message["timestamp"]}"\n' +
-                        f"(ERROR) {e}\n\n"
-                    )
-                    # log invite scan errors
+                log.error("INVITE SCAN ERROR", {
+                    "MESSAGE": message["content"],
+                    "TIMESTAMP": message["timestamp"]
+                }, e)
+                # log invite scan errors
 
         return False
         # do not halt if running within service read loop
@@ -82,11 +80,35 @@ def scan(discord_cids: list, auth: dict, join_func: callable) -> None:
     :param join_func: callback function defining channel join action
     """
     
+    if daemon.available():
+        batches = daemon.subscribe({"idents": [RESPONSE_IDENT]})
+        next(batches)
+        # subscribe to invites from local service daemon (skipping history)
+
+        for messages in batches:
+            if service.kill_flag:
+                service.kill_flag = False
+                return
+                # halt scanning when global kill flag set to true
+
+            if len(messages) == 0:
+                continue
+                # skip keep-alive batches
+
+            if join_func(messages):
+                return
+
+        return
+
     history = service.read_history(discord_cids, auth)
     # fetch message history
 
-    service.read_loop(history, discord_cids, auth, join_func)
-    # scan new messages for valid invite
+    service.read_loop(
+        history, discord_cids, auth, join_func,
+        polling={"max": service.PING_SPEED}
+    )
+    # scan new messages for valid invite (without idle backoff, since an
+    # invite is expected shortly)
 
     
 def send(request_id: str, tag: str, channel: Channel, public_key: bytes, webhooks: list) -> None:
@@ -106,5 +128,12 @@ def send(request_id: str, tag: str, channel: Channel, public_key: bytes, webhook
     webhook = random.choice(webhooks)
     # select random viable webhook
     
-    transmit.send(response.header(), response.encode(), webhook)
-    # transmit channel invite (join response)
\ No newline at end of file
+    header = response.header()
+    encoded = response.encode()
+
+    for _ in range(transmit.SEND_RETRIES + 1):
+        if transmit.send(header, encoded, webhook):
+            return
+            # transmit channel invite (join response, again if rate limited)
+
+    raise Exception("Invite not sent (webhook rate limit retries exhausted)")
\ No newline at end of file
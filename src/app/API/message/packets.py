@@ -6,20 +6,50 @@ Symmetric key encryption packet encoder and decoders.
 
 
 import base64
+import struct
 import time
-from app.crypto.symmetric import SKE
+from app.crypto.symmetric import suite_cipher
+from app.util import compress
+from typing import Union
 
 
 SKE_IDENT = "["
 # symmetric key encrypted message identifying start symbol
 
 
+VERSION_TOKEN = "~2"
+# versioned (authenticated) packet body start token, followed by a suite ID
+# (version 1 packet bodies start with a base64 IV, which never contains "~")
+
+
+COMPACT_TOKEN = "~3"
+# compact (binary, base85 encoded) authenticated packet body start token,
+# followed by a suite ID and optional flags
+
+
+COMPRESSED_FLAG = "z"
+# compact packet token flag marking compressed message text and attachments
+# (each prefixed with a compression method marker)
+
+
+SUITE_IDS = {"aes-gcm": "g", "chacha20-poly1305": "c"}
+# packet suite identifiers (by suite name)
+
+
+TIMESTAMP_FORMAT = ">d"
+# fixed-width packed plaintext timestamp format (compact packets)
+
+
 class SKEPacketEncoder:
     """
     Symmetric key encrypted message packet encoder object initialization.
     """
 
-    def __init__(self, tag: str, message: str, key: bytes, attachments: list = []) -> None:
+    def __init__(
+        self, tag: str, message: str, key: bytes, attachments: list = [],
+        suite: Union[str, None] = None, compact: bool = True,
+        compressed: bool = False
+    ) -> None:
         """
         Initializes an SKEPacketEncoder instance.
 
@@ -27,13 +57,27 @@ class SKEPacketEncoder:
         :param message: the content of the message to be encoded
         :param key: the cipher (channel) key used for encryption
         :param attachments: list of attachment objects associated with message
+        :param suite: authenticated encryption suite name (version 1 packets
+            are encoded if None)
+        :param compact: use the compact binary encoding for authenticated
+            packets
+        :param compressed: compress message text and attachments before
+            encryption (compact packets only, see "app.util.compress")
         """
         
         self.tag = tag
         self.message = message
-        self.cipher = SKE(key=key)
+        self.suite = suite
+        self.compact = compact
+        self.compressed = compressed and suite is not None and compact
+        self.cipher = suite_cipher(suite)(key=key)
         self.attachments = attachments
 
+        for attachment in attachments:
+            attachment.iv = suite_cipher(suite).iv()
+            # generate fresh attachment IVs suited to the cipher (on every
+            # encoding, so resent attachments never reuse a nonce)
+
  
     def header(self, name: str, id: str) -> str:
         """
@@ -54,6 +98,9 @@ class SKEPacketEncoder:
 
         :return: encoded message string
         """
+
+        if self.suite is not None and self.compact:
+            return self._encode_compact()
         
         plaintext = str(time.time()) + " " + self.tag + ": " + self.message
         # set plaintext to include timestamp, tag, and message body
@@ -65,6 +112,10 @@ class SKEPacketEncoder:
         # generate the base packet message, with the cipher's IV and encrypted
         # message (base64 encoded) with a space as the delimeter
 
+        if self.suite is not None:
+            packet_text = VERSION_TOKEN + SUITE_IDS[self.suite] + " " + packet_text
+            # mark authenticated packet version and suite
+
         if len(self.attachments) > 0:
             packet_text += "\n"
             packet_text += " ".join(
@@ -74,6 +125,38 @@ class SKEPacketEncoder:
             # include attached file IV values (if needed)
 
         return packet_text
+
+
+    def _encode_compact(self) -> str:
+        """
+        Builds and encodes the final message string in the compact format.
+
+        The packet body is a single base85 encoded binary blob of the nonce,
+        the attachment count and nonces, and the ciphertext (whose plaintext
+        starts with a packed timestamp).
+
+        :return: encoded message string
+        """
+
+        text = (self.tag + ": " + self.message).encode("utf-8")
+        token = COMPACT_TOKEN + SUITE_IDS[self.suite]
+
+        if self.compressed:
+            text = compress.pack(text)
+            token += COMPRESSED_FLAG
+            # compress message text (if worthwhile)
+
+        plaintext = struct.pack(TIMESTAMP_FORMAT, time.time()) + text
+        # set plaintext to include packed timestamp, tag, and message body
+
+        blob = (
+            self.cipher.iv + bytes([len(self.attachments)]) +
+            b"".join(a.iv for a in self.attachments) +
+            self.cipher.encrypt(plaintext, byte_output=True)
+        )
+        # pack nonce, attached file nonces and encrypted message
+
+        return token + " " + base64.b85encode(blob).decode("utf-8")
     
     
 class SKEPacketDecoder:
@@ -81,16 +164,21 @@ class SKEPacketDecoder:
     Symmetric key encrypted message packet decoder object initialization.
     """
 
-    def __init__(self, packet: str, key: bytes) -> None:
+    def __init__(
+        self, packet: str, key: bytes, channel_suite: Union[str, None]
+    ) -> None:
         """
         Initializes an SKEPacketDecoder instance.
 
         :param packet: the encoded message packet string
         :param key: the cipher (channel) key used for decryption
+        :param channel_suite: authenticated encryption suite name of the
+            channel (only version 1 packets are accepted if None)
         """
         
         self.packet = packet
         self.key = key
+        self.channel_suite = channel_suite
 
         self._parse()
         # parse packet upon initialization
@@ -107,6 +195,53 @@ class SKEPacketDecoder:
         self.body = data_split[0]
         # extract message body to exclude possible attachment IVs
 
+        self.suite = None
+        self.compact = self.body.startswith(COMPACT_TOKEN)
+        self.compressed = False
+
+        if self.compact or self.body.startswith(VERSION_TOKEN):
+            token, self.body = self.body.split(" ", 1)
+            suite_id = token[len(VERSION_TOKEN):len(VERSION_TOKEN) + 1]
+            flags = token[len(VERSION_TOKEN) + 1:]
+            # extract authenticated packet suite and flags
+
+            self.compressed = self.compact and COMPRESSED_FLAG in flags
+
+            self.suite = next(
+                (name for name, i in SUITE_IDS.items() if i == suite_id), None
+            )
+
+            if self.suite is None:
+                raise Exception(f'Unknown packet suite "{suite_id}"')
+
+        if self.suite != self.channel_suite:
+            raise Exception(
+                f'Packet suite "{self.suite or "v1"}" does not match ' +
+                f'channel suite "{self.channel_suite or "v1"}"'
+            )
+            # reject packets downgraded to (or otherwise using) a format the
+            # channel does not use
+
+        if self.compact:
+            blob = base64.b85decode(self.body)
+            nonce_size = len(suite_cipher(self.suite).iv())
+            count = blob[nonce_size]
+            offset = nonce_size + 1
+            # unpack compact packet nonce and attachment count
+
+            self._iv = blob[:nonce_size]
+            self.attachment_ivs = [
+                blob[offset + i * nonce_size:offset + (i + 1) * nonce_size]
+                for i in range(count)
+            ]
+            self._ciphertext = blob[offset + count * nonce_size:]
+            # unpack attachment nonces and ciphertext
+
+            return
+
+        self._iv_text, self.body = self.body.split(" ", 1)
+        # split base64 encoded IV from ciphertext
+
         if len(data_split) > 1:
             encoded_attachment_ivs = data_split[1].split()
             # extract base64 encoded attachment IVs to list if present
@@ -134,9 +269,57 @@ class SKEPacketDecoder:
         :return: decoded packet body information
         """
 
-        iv, self.body = self.body.split(" ", 1)
-        cipher = SKE(key=self.key, iv=base64.b64decode(iv))
-        # initialize cipher using key and message IV
+        if self.compact:
+            cipher = suite_cipher(self.suite)(key=self.key, iv=self._iv)
+            plaintext = cipher.decrypt(self._ciphertext, byte_output=True)
+            timestamp_size = struct.calcsize(TIMESTAMP_FORMAT)
+            # decrypt compact packet
+
+            text = plaintext[timestamp_size:]
+
+            if self.compressed:
+                text = compress.unpack(text)
+                # decompress message text
+
+            return (
+                base64.b64encode(self._iv).decode("utf-8") + " " +
+                repr(struct.unpack(TIMESTAMP_FORMAT, plaintext[:timestamp_size])[0]) +
+                " " + text.decode("utf-8")
+            )
+            # return base64 encoded IV text, timestamp and decoded message text
+
+        cipher = suite_cipher(self.suite)(
+            key=self.key, iv=base64.b64decode(self._iv_text)
+        )
+        # initialize cipher (for the packet version) using key and message IV
         
-        return iv + " " + cipher.decrypt(self.body)
-        # return base64 encoded IV text and decoded message (body) text
\ No newline at end of file
+        return self._iv_text + " " + cipher.decrypt(self.body)
+        # return base64 encoded IV text and decoded message (body) text
+
+
+def decode_chunk(
+    packets: list, key: bytes, channel_suite: Union[str, None]
+) -> list:
+    """
+    Decodes a chunk of packets (run in process pool workers to spread large
+    batches over multiple cores).
+
+    :param packets: list of encoded message packet strings
+    :param key: the cipher (channel) key used for decryption
+    :param channel_suite: authenticated encryption suite name of the channel
+
+    :return: list of decoded packet body information (or the raised exception
+        for packets that could not be decoded), in packet order
+    """
+
+    decoded = []
+
+    for packet in packets:
+        try:
+            decoded.append(SKEPacketDecoder(packet, key, channel_suite).decode())
+
+        except Exception as e:
+            decoded.append(e)
+            # return errors in place so one bad packet does not fail the chunk
+
+    return decoded
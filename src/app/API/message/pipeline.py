@@ -0,0 +1,198 @@
+"""
+Staged message receipt pipeline connected by bounded queues.
+
+:author: Max Milazzo
+"""
+
+
+import queue
+import threading
+import time
+from app.util import log
+from typing import Union
+
+
+PIPELINE_DEPTH = 64
+# maximum number of items waiting between two pipeline stages
+
+
+class Marker:
+    """
+    Batch boundary marker passed through every stage untouched.
+    """
+
+    def __init__(self, done: callable) -> None:
+        """
+        Batch marker initialization.
+
+        :param done: callback invoked once the batch has left the final stage
+        """
+
+        self.done = done
+
+
+class Stage:
+    """
+    Pipeline stage run on its own worker thread.
+    """
+
+    def __init__(
+        self, name: str, func: callable,
+        downstream: Union["Stage", None] = None, depth: int = PIPELINE_DEPTH
+    ) -> None:
+        """
+        Pipeline stage initialization.
+
+        :param name: stage name (used in timing statistics)
+        :param func: stage function taking an item and returning the item
+            passed downstream (or None to drop it)
+        :param downstream: next pipeline stage (None for the final stage)
+        :param depth: maximum number of items queued ahead of the stage
+        """
+
+        self.name = name
+        self.func = func
+        self.downstream = downstream
+        self.queue = queue.Queue(maxsize=depth)
+        # bounded input queue (producers block while it is full)
+
+        self.items = 0
+        self.busy = 0
+        self.blocked = 0
+        # stage timing statistics (seconds spent working and waiting on the
+        # downstream queue)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+
+    def start(self) -> None:
+        """
+        Starts the stage worker thread.
+        """
+
+        self._thread.start()
+
+
+    def _forward(self, item) -> None:
+        """
+        Passes an item to the downstream stage, or completes a batch marker
+        at the end of the pipeline.
+
+        :param item: stage output item
+        """
+
+        if self.downstream is not None:
+            start = time.perf_counter()
+            self.downstream.queue.put(item)
+            self.blocked += time.perf_counter() - start
+            # block while the downstream stage is backed up (backpressure)
+
+        elif isinstance(item, Marker):
+            try:
+                item.done()
+                # batch has passed through every stage
+
+            except Exception as e:
+                log.error("PIPELINE BATCH ERROR", {"STAGE": self.name}, e)
+                # log batch completion errors (such as a locked cache database)
+
+
+    def _run(self) -> None:
+        """
+        Stage worker loop.
+        """
+
+        while True:
+            item = self.queue.get()
+
+            try:
+                if not isinstance(item, Marker):
+                    start = time.perf_counter()
+                    item = self.func(item)
+                    self.busy += time.perf_counter() - start
+                    self.items += 1
+                    # run stage function on item
+
+                if item is not None:
+                    self._forward(item)
+
+            except Exception as e:
+                log.error("PIPELINE STAGE ERROR", {"STAGE": self.name}, e)
+                # log stage errors and drop the item (a stopped stage would
+                # block every producer once its queue fills)
+
+            finally:
+                self.queue.task_done()
+
+
+class Pipeline:
+    """
+    Chain of stages that overlaps network I/O, decryption and output.
+
+    Each stage runs on a single thread, so items leave the pipeline in the
+    order they were put in.
+    """
+
+    def __init__(self, stages: list, depth: int = PIPELINE_DEPTH) -> None:
+        """
+        Pipeline initialization.
+
+        :param stages: list of (stage name, stage function) pairs, in order
+        :param depth: maximum number of items queued ahead of each stage
+        """
+
+        self.stages = []
+        downstream = None
+
+        for name, func in reversed(stages):
+            downstream = Stage(name, func, downstream, depth)
+            self.stages.insert(0, downstream)
+            # link stages back to front
+
+        for stage in self.stages:
+            stage.start()
+
+
+    def put(self, items: list, done: Union[callable, None] = None) -> None:
+        """
+        Feeds a batch of items into the pipeline.
+
+        Blocks while the first stage's queue is full.
+
+        :param items: items to process
+        :param done: callback invoked once every item in the batch has passed
+            through the final stage
+        """
+
+        for item in items:
+            self.stages[0].queue.put(item)
+
+        if done is not None:
+            self.stages[0].queue.put(Marker(done))
+            # mark end of batch
+
+
+    def join(self) -> None:
+        """
+        Waits until every queued item has passed through the pipeline.
+        """
+
+        for stage in self.stages:
+            stage.queue.join()
+
+
+    def stats(self) -> dict:
+        """
+        Reports the throughput and timing of each stage.
+
+        :return: stage statistics
+        """
+
+        return {
+            stage.name: {
+                "items": stage.items,
+                "queued": stage.queue.qsize(),
+                "busy": stage.busy,
+                "blocked": stage.blocked
+            } for stage in self.stages
+        }
@@ -0,0 +1,86 @@
+"""
+Time-windowed message IV replay cache.
+
+:author: Max Milazzo
+"""
+
+
+import heapq
+
+
+class ReplayCache:
+    """
+    Constant time IV replay detection holding only IVs that could still be
+    accepted by timestamp validation.
+
+    A message is only accepted if its client timestamp is within the allowed
+    shift of its server timestamp, so a replay of a message first seen at
+    server time T can only pass validation if it is posted before
+    T + 2 * (maximum shift).  IVs older than that window are evicted.
+    """
+
+    def __init__(self, window: float) -> None:
+        """
+        Replay cache initialization.
+
+        :param window: time (in seconds) an IV is held after its server
+            timestamp
+        """
+
+        self.window = window
+
+        self._ivs = set()
+        # held message IVs (for constant time lookup)
+
+        self._expiry = []
+        # heap of (server timestamp, IV) used to evict expired IVs
+
+        self._high_water = 0
+        # newest server timestamp seen
+
+
+    def _evict(self) -> None:
+        """
+        Removes IVs that can no longer be replayed.
+        """
+
+        cutoff = self._high_water - self.window
+
+        while len(self._expiry) > 0 and self._expiry[0][0] < cutoff:
+            _, iv = heapq.heappop(self._expiry)
+            self._ivs.discard(iv)
+
+
+    def add(self, iv: str, server_timestamp: float) -> bool:
+        """
+        Adds a message IV to the cache.
+
+        :param iv: message IV
+        :param server_timestamp: message server timestamp (epoch seconds)
+
+        :return: True if the IV had not been seen before, False otherwise
+        """
+
+        if server_timestamp > self._high_water:
+            self._high_water = server_timestamp
+            self._evict()
+            # advance window
+
+        if iv in self._ivs:
+            return False
+            # repeat IV
+
+        self._ivs.add(iv)
+        heapq.heappush(self._expiry, (server_timestamp, iv))
+
+        return True
+
+
+    def __len__(self) -> int:
+        """
+        Counts held IVs.
+
+        :return: number of IVs held
+        """
+
+        return len(self._ivs)
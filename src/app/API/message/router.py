@@ -0,0 +1,86 @@
+"""
+Message channel routing index.
+
+:author: Max Milazzo
+"""
+
+
+from app.API.message.packets import SKE_IDENT
+from app.util.channel import Channel
+from typing import Union
+
+
+class Router:
+    """
+    Routing index of app channels, so one fetch stream can be decoded for
+    every joined channel with a single header lookup per message.
+    """
+
+    def __init__(self) -> None:
+        """
+        Router initialization.
+        """
+
+        self.routes = {}
+        # map of app channel ID to (channel, process function) route
+
+
+    def add(self, channel: Channel, process_func: Union[callable, None] = None) -> None:
+        """
+        Adds a channel route.
+
+        :param channel: channel to process messages from
+        :param process_func: decrypted message custom process callback function
+            (messages are displayed if None)
+        """
+
+        self.routes[channel.id] = (channel, process_func)
+
+
+    def remove(self, channel_id: str) -> None:
+        """
+        Removes a channel route.
+
+        :param channel_id: app channel ID
+        """
+
+        self.routes.pop(channel_id, None)
+
+
+    def lookup(self, header: str) -> Union[tuple, None]:
+        """
+        Finds the route for a message header line.
+
+        :param header: message header line
+        :return: (channel, process function) route (or None if not routed)
+        """
+
+        return self.routes.get(header.rsplit(" ", 1)[-1])
+
+
+    def route(self, message: dict) -> Union[tuple, None]:
+        """
+        Finds the route for a message.
+
+        :param message: message data dictionary
+        :return: (channel, process function) route (or None if the message is
+            not a symmetric key encrypted message for a routed channel)
+        """
+
+        content = message["content"]
+
+        if not content.startswith(SKE_IDENT):
+            return None
+            # skip non-symmetric key encrypted messages
+
+        return self.lookup(content.split("\n", 1)[0])
+
+
+    def __len__(self) -> int:
+        """
+        Counts routed channels.
+
+        :return: number of routed channels
+        """
+
+        return len(self.routes)
@@ -5,12 +5,24 @@ Standard message receipt service.
 """
 
 
-from app.API.connection import service
-from app.API.message.packets import SKEPacketDecoder, SKE_IDENT
+import signal
+import sys
+import threading
+from app.API.connection import service, snowflake
+from app.API.connection.cache import MessageCache
+from app.API.connection.gateway import Gateway
+from app.API.daemon import client as daemon
+from app.API.message.packets import SKEPacketDecoder, SKE_IDENT, decode_chunk
+from app.API.message.pipeline import Pipeline
+from app.API.message.replay import ReplayCache
+from app.API.message.router import Router
+from app.crypto import context
 from app.util.channel import Channel
 from app.util.media import Attachment
-from app.util.paths import ERROR_LOG_PATH
-from datetime import datetime, timezone
+from app.util import display, log
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from typing import Union
 
 
@@ -18,8 +30,34 @@ TIMESTAMP_SHIFT_MAX = 60
 # defines the maximum allowed timestamp shift between server and client timestamps
 
 
-seen_ivs = []
-# global list of previously seen message IV values used to perform IV authentication
+DECODE_POOL_MIN = 64
+# minimum message batch size decoded over the process pool
+
+
+DECODE_CHUNK = 32
+# number of packets sent to a process pool worker at once
+
+
+RECENT_MAX = 5000
+# maximum number of recent messages kept for replay on channel switches
+
+
+decode_pool = None
+# global decode process pool (created on first large batch)
+
+
+predecoded = {}
+# global map of message ID to (future, chunk index) for messages being
+# decoded over the process pool
+
+
+renderer = display.Renderer()
+# global message display renderer
+
+
+replay_caches = {}
+# global map of app channel ID to replay cache of previously seen message IV
+# values used to perform IV authentication
 
 
 def parse(
@@ -36,18 +74,17 @@ def parse(
     :param process_func: decrypted message custom process callback function
     """
 
-    global seen_ivs
-    
     epoch_server_timestamp = server_timestamp.timestamp()
     message_iv, message_timestamp, message_plaintext = plaintext.split(" ", 2)
     # parse plaintext message information
 
-    if message_iv in seen_ivs:
+    if channel.id not in replay_caches:
+        replay_caches[channel.id] = ReplayCache(2 * TIMESTAMP_SHIFT_MAX)
+        # IVs outside the timestamp acceptance window cannot be replayed
+
+    if not replay_caches[channel.id].add(message_iv, epoch_server_timestamp):
         raise Exception("Repeat encoding IV encountered")
-        # detect repeat message IV
-        
-    seen_ivs.append(message_iv)
-    # add message IV to global list
+        # detect repeat message IV (and add it to the channel replay cache)
 
     message_timestamp = float(message_timestamp)
     time_diff = abs(epoch_server_timestamp - message_timestamp)
@@ -61,7 +98,7 @@ def parse(
         # detect timestamp validation error
     
     if process_func is None:
-        print(f"[{server_timestamp}]\n{message_plaintext}\n", flush=True)
+        entry = f"[{server_timestamp}]\n{message_plaintext}\n\n"
         # display timestamped messages by default
 
         for index, attachment in enumerate(message["attachments"]):
@@ -77,75 +114,302 @@ def parse(
             download_code = f"{channel.id}/{message['channel_id']}/{message['id']}.{index}"
             # generate attachment download code
 
-            print(f'<attachment "{filename}">\n{download_code}\n', flush=True)
+            entry += f'<attachment "{filename}">\n{download_code}\n\n'
             # display attachment data
+
+        renderer.write(entry)
+        # buffer message display text
     
     else:
         process_func(message_plaintext, message, channel, server_timestamp)
         # process message with callback function otherwise
 
 
-def process(messages: list, channel: Channel, process_func: Union[callable, None]) -> bool:
+def log_error(
+    channel: Union[Channel, None], ciphertext: str, server_timestamp,
+    error: Exception
+) -> None:
+    """
+    Logs a message display error.
+
+    :param channel: channel the message was processed from (None if unknown)
+    :param ciphertext: message ciphertext (or "N/A")
+    :param server_timestamp: message timestamp from Discord server (or "N/A")
+    :param error: raised exception
+    """
+
+    log.error("MESSAGE DISPLAY ERROR", {
+        "MESSAGE CHANNEL": "N/A" if channel is None else channel.name,
+        "ENCRYPTED TEXT": ciphertext,
+        "SERVER TIMESTAMP": server_timestamp
+    }, error)
+    # log message display errors
+
+
+def resolve(message: dict, router: Router) -> Union[tuple, None]:
+    """
+    Resolves oversized message content and routes the message (fetch stage).
+
+    :param message: Discord message data dictionary
+    :param router: channel routing index
+
+    :return: (message, route) tuple (or None if the message should be skipped)
+    """
+
+    try:
+        Attachment.message_handler(
+            message, lambda header: router.lookup(header) is not None
+        )
+        # handle and proprly format oversized messages with attachment data
+        # (only downloading data for messages in routed channels)
+
+    except Exception as e:
+        route = router.route(message)
+        log_error(None if route is None else route[0], "N/A", "N/A", e)
+        return None
+
+    route = router.route(message)
+
+    if route is None:
+        return None
+        # skip messages not belonging to a routed channel
+
+    return message, route
+
+
+def predecode(messages: list, router: Router) -> None:
+    """
+    Starts decoding a large batch of messages over the process pool.
+
+    Only packet decryption is moved off the main process; replay and timestamp
+    validation still run in message order in the render stage.
+
+    :param messages: list of messages (sorted by timestamp)
+    :param router: channel routing index
+    """
+
+    global decode_pool
+
+    selected = {}
+    count = 0
+
+    for message in messages:
+        if Attachment.oversized(message):
+            continue
+
+        route = router.route(message)
+
+        if route is not None:
+            selected.setdefault(route[0].id, (route[0], []))[1].append(message)
+            count += 1
+            # group packets by channel (each channel has its own key)
+
+    if count < DECODE_POOL_MIN:
+        return
+        # small batches are faster to decode in process
+
+    if decode_pool is None:
+        decode_pool = ProcessPoolExecutor()
+
+    for channel, channel_messages in selected.values():
+        for start in range(0, len(channel_messages), DECODE_CHUNK):
+            chunk = channel_messages[start:start + DECODE_CHUNK]
+            future = decode_pool.submit(
+                decode_chunk, [message["content"] for message in chunk],
+                channel.key, channel.suite
+            )
+            # decode chunk of packets in a worker process (amortizing IPC)
+
+            for index, message in enumerate(chunk):
+                predecoded[message["id"]] = (future, index)
+
+
+def decrypt(routed: tuple) -> Union[tuple, None]:
+    """
+    Parses and decrypts a message packet (decrypt stage).
+
+    :param routed: fetch stage output tuple
+
+    :return: (plaintext, message, server timestamp, ciphertext, route) tuple
+        (or None if the message cannot be decrypted)
+    """
+
+    message, route = routed
+    channel = route[0]
+
+    ciphertext = "N/A"
+    server_timestamp = "N/A"
+    # default ciphertext and server timestamp strings used in error messages
+
+    try:
+        server_timestamp = snowflake.to_datetime(message["id"])
+        # extract server timestamp from message ID
+        
+        pending = predecoded.pop(message["id"], None)
+
+        decoder = SKEPacketDecoder(
+            message["content"], channel.key, channel.suite
+        )
+        ciphertext = decoder.body
+        # initialize message packet decoder object and store ciphertext value
+        # for possible use in error message
+
+        if pending is not None:
+            future, index = pending
+            plaintext = future.result()[index]
+            # collect packet decoded over the process pool
+
+            if isinstance(plaintext, Exception):
+                raise plaintext
+
+        else:
+            plaintext = decoder.decode()
+
+        return plaintext, message, server_timestamp, ciphertext, route
+
+    except Exception as e:
+        log_error(channel, ciphertext, server_timestamp, e)
+
+
+def render(decoded: tuple) -> None:
+    """
+    Validates and displays a decrypted message (render stage).
+
+    :param decoded: decrypt stage output tuple
+    """
+
+    plaintext, message, server_timestamp, ciphertext, route = decoded
+    channel, process_func = route
+
+    try:
+        parse(plaintext, message, channel, server_timestamp, process_func)
+        # parse, validate, and process message
+
+    except Exception as e:
+        log_error(channel, ciphertext, server_timestamp, e)
+
+
+def receiver(router: Router) -> Pipeline:
+    """
+    Creates a staged message receipt pipeline.
+
+    Oversized content downloads, decryption and output each run on their own
+    thread, so a slow download or terminal does not stall message polling.
+
+    :param router: channel routing index
+
+    :return: message receipt pipeline
+    """
+
+    return Pipeline([
+        ("fetch", lambda message: resolve(message, router)),
+        ("decrypt", decrypt),
+        ("render", render)
+    ])
+
+
+def process(
+    messages: list, router: Router, pipeline: Union[Pipeline, None] = None,
+    done: Union[callable, None] = None
+) -> bool:
     """
     Decrypts and processes messages.
 
     :param messages: list of encrypted messages to be processed
-    :param channel: channel to process messages from
-    :param process_func: decrypted message custom process callback function
+    :param router: channel routing index
+    :param pipeline: message receipt pipeline (messages are processed inline
+        if None)
+    :param done: callback invoked once every message has been processed
 
     :return: service read loop kill flag status (False)
     """
 
-    for message in sorted(messages, key=lambda message: message["timestamp"]):
-    # loop through messages sorted by timestamp
+    messages = snowflake.sort(messages)
+    # process messages in the order they were sent
 
-        ciphertext = "N/A"
-        server_timestamp = "N/A"
-        # default ciphertext and server timestamp strings used in error messages
+    Attachment.prefetch(
+        messages, lambda header: router.lookup(header) is not None
+    )
+    # start downloading oversized message bodies for routed channels
 
-        try:
-            Attachment.message_handler(message)
-            # handle and proprly format oversized messages with attachment data
+    predecode(messages, router)
+    # decode large batches (such as history replays) over multiple cores
 
-            if not message["content"].startswith(SKE_IDENT):
-                continue
-                # skip non-symmetric key encrypted messages
-        
-            server_timestamp = datetime.fromisoformat(message["timestamp"])
-            # parse server timestamp
-            
-            decoder = SKEPacketDecoder(message["content"], channel.key)
-            # initialize message packet decoder object
-
-            if decoder.header() == channel.id:
-                plaintext = decoder.decode()
-                # decode message if it belongs to the correct channel
-
-                ciphertext = decoder.body
-                # store ciphertext value for possible use in error message
-
-                parse(plaintext, message, channel, server_timestamp, process_func)
-                # parse, validate, and process message
-                
-        except Exception as e:
-            with open(ERROR_LOG_PATH, "a") as f:
-                f.write(
-                    "[MESSAGE DISPLAY ERROR]\n" +
-                    f'MESSAGE CHANNEL   : "{channel.name}"\n' +
-                    f'ENCRYPTED TEXT    : "{ciphertext}"\n' +
-                    f"SERVICE TIMESTAMP : [{datetime.now(tz=timezone.utc)}]\n" + 
-                    f"SERVER TIMESTAMP  : [{server_timestamp}]\n" +
-                    f"(ERROR) {e}\n\n"
-                )
-                # log message display errors
+    def finish() -> None:
+        """
+        Displays the processed batch and runs the batch callback.
+        """
+
+        renderer.flush()
+
+        if done is not None:
+            done()
+
+    if pipeline is not None:
+        pipeline.put(messages, finish)
+        # hand messages off to pipeline stages
+
+    else:
+        for message in messages:
+            routed = resolve(message, router)
+
+            if routed is not None:
+                decoded = decrypt(routed)
+
+                if decoded is not None:
+                    render(decoded)
+                    # run pipeline stages inline
+
+        finish()
 
     return False
     # do not halt if running within service read loop
 
 
+def terminate(signum: int, frame) -> None:
+    """
+    Stops the service process on SIGTERM.
+
+    Pool workers are separate processes that would outlive a terminated
+    service, so the decode pool is shut down before exiting. Buffered error
+    records are written first, since the logger's own SIGTERM handler is not
+    installed once this one is.
+
+    :param signum: received signal number
+    :param frame: interrupted stack frame
+    """
+
+    if decode_pool is not None:
+        decode_pool.shutdown(cancel_futures=True)
+
+    log.shutdown()
+    # write remaining error records
+
+    sys.exit(0)
+
+
+def title(channel: Channel) -> None:
+    """
+    Displays a channel header.
+
+    :param channel: displayed channel
+    """
+
+    title = "CHANNEL: " + channel.name
+    # set channel display title
+
+    print("=" * (len(title) + 2), flush=True)
+    print(title + " |", flush=True)
+    print("_" * (len(title) + 1) + "|\n", flush=True)
+    # display channel header text
+
+
 def start(
     channel: Channel, discord_cids: list, auth: dict,
-    process_func: Union[callable, None] = None
+    process_func: Union[callable, None] = None,
+    polling: Union[dict, None] = None, wake=None, push: bool = False,
+    cache_key: Union[bytes, None] = None, offline: bool = False,
+    history_max: Union[int, None] = None, select=None
 ) -> None:
     """
     Start the message receipt service.
@@ -154,25 +418,173 @@ def start(
     :param discord_cids: Discord channel IDs to fetch messages from
     :param auth: authorization headers for making requests to the Discord API
     :param process_func: decrypted message custom process callback function
+    :param polling: profile polling interval configuration
+    :param wake: event set on local message sends to trigger a fast poll
+    :param push: receive messages over the Discord Gateway (falling back to
+        polling while disconnected)
+    :param cache_key: local lock key used to encrypt the on-disk message
+        cache (no caching if None)
+    :param offline: only display cached messages (no Discord requests)
+    :param history_max: maximum number of past messages displayed (no limit if
+        None)
+    :param select: queue of channel selections (the displayed channel is
+        switched in place, replaying recent messages, for each selection)
     """
     
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, terminate)
+        # shut down the decode pool when the service process is terminated
+
     if process_func is None:
-    # display message channel header if custom processing not set
+        title(channel)
+        # display message channel header if custom processing not set
 
-        title = "CHANNEL: " + channel.name
-        # set channel display title
+    router = Router()
+    router.add(channel, process_func)
+    pipeline = receiver(router)
+    # route channel messages through message receipt pipeline stages
+
+    recent = deque(maxlen=RECENT_MAX)
+    switch_lock = threading.Lock()
+    # recently received messages (replayed on channel switches) and lock
+    # serializing message intake with channel switches
 
-        print("=" * (len(title) + 2), flush=True)
-        print(title + " |", flush=True)
-        print("_" * (len(title) + 1) + "|\n", flush=True)
-        # display channel header text
-    
-    history = service.read_history(discord_cids, auth)
-    process(history, channel, process_func)
-    # display past messages in channel
+    def receive(messages: list, done: Union[callable, None] = None) -> bool:
+        """
+        Records and processes received messages.
+
+        :param messages: list of encrypted messages
+        :param done: callback invoked once every message has been processed
+
+        :return: service read loop kill flag status (False)
+        """
+
+        with switch_lock:
+            recent.extend(messages)
+            return process(messages, router, pipeline, done)
+
+    def switch(selected: Channel) -> None:
+        """
+        Switches the displayed channel without restarting the service.
+
+        :param selected: channel to display
+        """
+
+        with switch_lock:
+            pipeline.join()
+            renderer.reset()
+            # finish with (and discard output for) the current channel
+
+            for channel_id in list(router.routes):
+                router.remove(channel_id)
+
+            router.add(selected, process_func)
+            replay_caches.pop(selected.id, None)
+            context.clear()
+            # route the new channel (its past messages are replayed, so their
+            # IVs are seen again) and drop cached key contexts of the previous
+            # channel
+
+            display.clear()
+
+            if process_func is None:
+                title(selected)
+
+            renderer.hold(history_max)
+            process(list(recent), router, pipeline, renderer.release)
+            # display past messages in channel
+
+    def listen() -> None:
+        """
+        Switches the displayed channel on each selection.
+        """
+
+        for selected in iter(select.get, None):
+            switch(selected)
+
+    if select is not None and not offline:
+        threading.Thread(target=listen, daemon=True).start()
+        # switch channels while messages are received
+
+    renderer.hold(history_max)
+    # display past messages once they have all been processed
+
+    if not offline and daemon.available():
+        history = True
+
+        for messages in daemon.subscribe({"idents": [SKE_IDENT]}):
+        # subscribe to every channel (the router selects the displayed one)
+
+            if history:
+                receive(messages, renderer.release)
+                history = False
+                # display past messages in channel
+
+            elif len(messages) > 0:
+                receive(messages)
+                # display new messages as the local service daemon receives
+                # them
+
+        return
+
+    cache = None
+    history = []
+    cursors = None
+
+    if cache_key is not None:
+        cache = MessageCache(cache_key)
+        history = cache.load(discord_cids)
+        cursors = {
+            str(discord_cid): cache.checkpoint(discord_cid)
+            for discord_cid in discord_cids
+        }
+        receive(history)
+        # display cached messages immediately
+
+    def store(messages: list) -> Union[callable, None]:
+        """
+        Creates a callback that caches messages once they are processed.
+
+        :param messages: list of messages
+        :return: cache callback (or None if caching is disabled)
+        """
+
+        if cache is None:
+            return None
+
+        return lambda: cache.store(messages)
+        # cache processed messages (with oversized content resolved)
+
+    if offline:
+        receive([], renderer.release)
+
+        if select is not None:
+            listen()
+            # keep switching between cached channels
+
+        pipeline.join()
+        return
+        # only cached messages are displayed in offline mode
     
+    gateway = None
+
+    if push:
+        gateway = Gateway(discord_cids, auth)
+        gateway.start()
+        # connect Gateway push receiver
+
+    if len(history) == 0:
+        history = service.read_history(discord_cids, auth)
+        receive(history, store(history))
+        # display past messages in channel (when none are cached)
+
+    receive([], renderer.release)
+    # end of past messages
+
     service.read_loop(
         history, discord_cids, auth,
-        lambda messages: process(messages, channel, process_func)
+        lambda messages: receive(messages, store(messages)),
+        polling, wake, gateway, cursors
     )
-    # start service read loop to scan for new message to decode and display
\ No newline at end of file
+    # start service read loop to scan for new message to decode and display
+    # (resuming from cache checkpoints, so only the delta is fetched)
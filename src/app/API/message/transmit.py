@@ -25,19 +25,32 @@ def send(
     :param attachments: list of attachment objects associated with message
     """
 
-    packet = SKEPacketEncoder(tag, message_text, channel.key, attachments)
-    # initialize message packet encoder object
-
-    header = packet.header(channel.name, channel.id)
-    # generate message header
-    
-    webhook = random.choice(webhooks)
-    # select random viable webhook
-
-    attachment_files = [
-        attachment.encode(channel.key) for attachment in attachments
-    ]
-    # generate encoded attachment files
-
-    transmit.send(header, packet.encode(), webhook, attachment_files)
-    # transmit header and encoded message packet data to selected webhook
\ No newline at end of file
+    for _ in range(transmit.SEND_RETRIES + 1):
+        packet = SKEPacketEncoder(
+            tag, message_text, channel.key, attachments, channel.suite,
+            compressed=channel.compressed
+        )
+        # initialize message packet encoder object (with the channel's
+        # encryption suite and compression setting, and fresh IVs on every
+        # attempt so a resent message never reuses a nonce)
+
+        header = packet.header(channel.name, channel.id)
+        # generate message header
+        
+        webhook = random.choice(webhooks)
+        # select random viable webhook
+
+        attachment_files = [
+            attachment.encode(channel.key, channel.suite, packet.compressed)
+            for attachment in attachments
+        ]
+        # generate encoded attachment files (streamed from disk as they are
+        # uploaded)
+
+        if transmit.send(header, packet.encode(), webhook, attachment_files):
+            return
+            # transmit header and encoded message packet data to selected
+            # webhook (encoding again if rate limited)
+
+    raise Exception("Message not sent (webhook rate limit retries exhausted)")
+    # never drop a message silently
@@ -6,6 +6,7 @@ Channel deletion UI component.
 
 
 from app.UI.modules import main
+from app.crypto import context
 from app.util.channel import channel_search
 from tkinter import messagebox
 
@@ -33,7 +34,8 @@ def confirm_delete() -> None:
     
         cur_channel = channel_search(main.channels, cur_channel_name)
         main.channels.remove(cur_channel)
-        # delete channel from data
+        context.discard(cur_channel.key)
+        # delete channel from data (and drop its cached key contexts)
             
         r_index = main.channel_drop["menu"].index(cur_channel_name)
         main.channel_drop["menu"].delete(r_index)
@@ -183,6 +183,53 @@ def open_rename_window(edit_listbox: Listbox) -> None:
     # add text clear button
 
 
+def toggle_compression(edit_listbox: Listbox) -> None:
+    """
+    Toggles message compression for the selected channel.
+
+    :param edit_listbox: channel edit listbox
+    """
+
+    selected_index = edit_listbox.curselection()
+    # get current selected channel index
+
+    if not selected_index:
+        return
+        # return if no channel selected
+
+    channel = channel_search(main.channels, edit_listbox.get(selected_index))
+    # search for channel object by name
+
+    if channel.compressed:
+        channel.compressed = False
+        messagebox.showinfo(
+            title="Compression",
+            message=f'Compression disabled for "{channel.name}"'
+        )
+        # disable compression
+
+    elif channel.suite is None:
+        messagebox.showinfo(
+            title="Compression",
+            message=(
+                f'"{channel.name}" uses the original message format, ' +
+                "which does not support compression"
+            )
+        )
+        # compression requires authenticated (compact) packets
+
+    elif messagebox.askyesno(
+        title="Compression",
+        message=(
+            f'Compress messages and attachments sent to "{channel.name}"?\n\n' +
+            "Compressed sizes depend on content, so message and file sizes " +
+            "may reveal information about what was sent."
+        )
+    ):
+        channel.compressed = True
+        # enable compression once the size leak is acknowledged
+
+
 def show_info(edit_listbox: Listbox) -> None:
     """
     Display channel information.
@@ -263,8 +310,15 @@ def open_edit_window() -> None:
     )
     # create information button
 
+    compress_button = Button(
+        ntoolbar_frame, text=" z ",
+        command=lambda: toggle_compression(edit_listbox)
+    )
+    # create compression toggle button
+
     info_button.pack(side="left", padx=2, pady=2)
     move_up_button.pack(side="left", padx=(10, 2), pady=2)
     move_down_button.pack(side="left", padx=2, pady=2)
+    compress_button.pack(side="left", padx=(10, 2), pady=2)
     ntitle_label.pack(pady=5)
     # place elements
\ No newline at end of file
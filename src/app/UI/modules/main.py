@@ -6,7 +6,9 @@ Main UI module.
 
 
 import multiprocessing
+from app.API.daemon import client as daemon
 from app.API.message import service, transmit
+from app.lock import lock
 from app.util import config, display
 from app.util.channel import Channel, channel_search
 from app.util.media import Attachment
@@ -18,12 +20,22 @@ service_process = None
 # specify current main API service process globally
 
 
+wake_event = multiprocessing.Event()
+# event set on message send to wake the service process for a fast poll
+
+
+select_queue = multiprocessing.Queue()
+# queue of channel selections sent to the running service process
+
+
 attachments = []
 # list of attachments to be sent with current message
 
 
 def start_service(
-    channel: Union[Channel, None], discord_cids: list, auth: dict
+    channel: Union[Channel, None], discord_cids: list, auth: dict,
+    polling: Union[dict, None] = None, push: bool = False,
+    offline: bool = False, history_max: Union[int, None] = None
 ) -> Union[multiprocessing.Process, None]:
     """
     Starts API service.
@@ -31,17 +43,31 @@ def start_service(
     :param channel: channel object to start service on
     :param disc_cids: list of Discord channel IDs to send messages to
     :param auth: Discord authentication credentials
+    :param polling: profile polling interval configuration
+    :param push: receive messages over the Discord Gateway
+    :param offline: only display cached messages
+    :param history_max: maximum number of past messages displayed
     :return: API service process (or None on failure)
     """
     
     if channel is None:
         return None
         # return None on failure
+
+    cache_key = None
+
+    if lock.cipher is not None:
+        cache_key = lock.cipher.key
+        # encrypt message cache using the local lock key
     
     service_process = multiprocessing.Process(
         target=service.start, args=(
             channel, discord_cids, auth
-        )
+        ), kwargs={
+            "polling": polling, "wake": wake_event, "push": push,
+            "cache_key": cache_key, "offline": offline,
+            "history_max": history_max, "select": select_queue
+        }
     )
     service_process.start()
     # create and start service
@@ -98,6 +124,12 @@ def send_message(
     transmit.send(tag, message_text, channel, webhooks, attachments)
     # send message to server
 
+    wake_event.set()
+    # wake service to promptly poll for the sent message
+
+    daemon.wake()
+    # wake local service daemon instead when it owns polling (if running)
+
     clear()
     # clear message data
 
@@ -118,15 +150,25 @@ def channel_select(
     
     channel = channel_search(channels, channel_name)
     # search for channel object by name
+
+    if channel is None:
+        return
+        # ignore empty selections
+
+    if service_process is not None and service_process.is_alive():
+        select_queue.put(channel)
+        return
+        # switch channel within the running service process (keeping its
+        # connections, caches and received messages)
     
     display.clear()
-    
-    if service_process is not None:
-        service_process.terminate()
-        # terminate current service process
         
-    service_process = start_service(channel, discord_cids, auth)
-    # start new API service process
+    service_process = start_service(
+        channel, discord_cids, auth, server_config.get("polling"),
+        server_config.get("gateway", False), server_config.get("offline", False),
+        server_config.get("history")
+    )
+    # start API service process
 
 
 def attach_files() -> None:
@@ -140,14 +182,11 @@ def attach_files() -> None:
     # get attachment filepaths
 
     for path in filepaths:
-        with open(path, "rb") as f:
-            raw_data = f.read()
-            # read attachment file byte data
-
         attachments.append(
-            Attachment(raw_data, path=path)
+            Attachment(path=path)
         )
-        # add attachments to global list
+        # add attachments to global list (file data is read and encrypted
+        # in chunks when sent)
 
     attachment_basenames = [
         "<attachment \"{}\">".format(
@@ -0,0 +1,81 @@
+"""
+Reusable authenticated encryption context registry.
+
+Only AEAD objects (such as AESGCM and ChaCha20Poly1305) are registered: each
+one is built once per key and then encrypts or decrypts any number of
+messages given a nonce. CBC and streaming ciphers need a new Cipher and
+encryptor/decryptor per IV, so caching their key wrappers would save nothing.
+
+:author: Max Milazzo
+"""
+
+
+import threading
+from collections import OrderedDict
+
+
+CONTEXT_MAX = 64
+# maximum number of key contexts held in the registry
+
+
+_contexts = OrderedDict()
+# global map of (algorithm, key) to key context (least recently used first)
+
+
+_lock = threading.Lock()
+# lock guarding the key context registry
+
+
+def get(algorithm: type, key: bytes):
+    """
+    Retrieves a pre-initialized key context, so each message only needs to
+    supply its nonce and data.
+
+    :param algorithm: authenticated encryption class
+    :param key: encryption key
+
+    :return: key context
+    """
+
+    registry_key = (algorithm, key)
+
+    with _lock:
+        context = _contexts.get(registry_key)
+
+        if context is not None:
+            _contexts.move_to_end(registry_key)
+            return context
+            # reuse existing context
+
+    context = algorithm(key)
+    # initialize context (validates the key once)
+
+    with _lock:
+        _contexts[registry_key] = context
+
+        if len(_contexts) > CONTEXT_MAX:
+            _contexts.popitem(last=False)
+            # evict least recently used context
+
+    return context
+
+
+def discard(key: bytes) -> None:
+    """
+    Removes every key context for a key (such as when its channel is removed).
+
+    :param key: encryption key
+    """
+
+    with _lock:
+        for registry_key in [k for k in _contexts if k[1] == key]:
+            del _contexts[registry_key]
+
+
+def clear() -> None:
+    """
+    Removes every key context from the registry.
+    """
+
+    with _lock:
+        _contexts.clear()
@@ -7,8 +7,11 @@ Symmetric key encryption object definition.
 
 import base64
 import secrets
-from cryptography.hazmat.primitives import padding
+import struct
+from app.crypto import context
+from cryptography.hazmat.primitives import padding, poly1305
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
 from typing import Union
 
 
@@ -24,11 +27,131 @@ BYTE_SIZE = 8
 # assumed byte size (in bits)
 
 
+NONCE_SIZE = 96
+# authenticated encryption nonce size (in bits)
+
+
+class StreamEncryptor:
+    """
+    Incremental encryptor producing the same output as a single (byte output)
+    "encrypt" call, so large data can be encrypted in chunks.
+    """
+
+    def __init__(self, encryptor, padder=None, tag: bool = False) -> None:
+        """
+        Incremental encryptor initialization.
+
+        :param encryptor: cipher encryptor context
+        :param padder: padding context (if the mode requires padding)
+        :param tag: append the encryptor's authentication tag on finalization
+        """
+
+        self.encryptor = encryptor
+        self.padder = padder
+        self.tag = tag
+
+
+    def update(self, data: bytes) -> bytes:
+        """
+        Encrypts a chunk of data.
+
+        :param data: plaintext chunk
+        :return: ciphertext produced so far
+        """
+
+        if self.padder is not None:
+            data = self.padder.update(data)
+
+        return self.encryptor.update(data)
+
+
+    def finalize(self) -> bytes:
+        """
+        Completes encryption.
+
+        :return: remaining ciphertext (and authentication tag)
+        """
+
+        data = b""
+
+        if self.padder is not None:
+            data = self.encryptor.update(self.padder.finalize())
+            # encrypt final padded block
+
+        data += self.encryptor.finalize()
+
+        if self.tag:
+            data += self.encryptor.tag
+
+        return data
+
+
+class ChaChaStreamEncryptor:
+    """
+    Incremental ChaCha20-Poly1305 encryptor (RFC 8439 construction, without
+    associated data) producing the same output as ChaCha20Poly1305.encrypt,
+    which has no incremental interface.
+    """
+
+    def __init__(self, key: bytes, nonce: bytes) -> None:
+        """
+        Incremental encryptor initialization.
+
+        :param key: encryption key
+        :param nonce: 96-bit nonce
+        """
+
+        poly_key = Cipher(
+            algorithms.ChaCha20(key, struct.pack("<I", 0) + nonce), mode=None
+        ).encryptor().update(bytes(32))
+        # derive one-time Poly1305 key from the first keystream block
+
+        self.encryptor = Cipher(
+            algorithms.ChaCha20(key, struct.pack("<I", 1) + nonce), mode=None
+        ).encryptor()
+        self.mac = poly1305.Poly1305(poly_key)
+        self.size = 0
+        # encrypt from the second keystream block, authenticating ciphertext
+
+
+    def update(self, data: bytes) -> bytes:
+        """
+        Encrypts a chunk of data.
+
+        :param data: plaintext chunk
+        :return: ciphertext chunk
+        """
+
+        ciphertext = self.encryptor.update(data)
+        self.mac.update(ciphertext)
+        self.size += len(ciphertext)
+
+        return ciphertext
+
+
+    def finalize(self) -> bytes:
+        """
+        Completes encryption.
+
+        :return: authentication tag
+        """
+
+        self.mac.update(
+            bytes(-self.size % 16) + struct.pack("<QQ", 0, self.size)
+        )
+        # pad ciphertext and append (associated data and ciphertext) lengths
+
+        return self.mac.finalize()
+
+
 class AES:
     """
     AES (CBC) encryption object.
     """
 
+    streamable = True
+    # supports incremental encryption
+
     @staticmethod
     def key(key_size: int = KEY_SIZE) -> bytes:
         """
@@ -123,6 +246,31 @@ class AES:
         return ciphertext
     
 
+    def encryptor(self) -> StreamEncryptor:
+        """
+        Creates an incremental AES encryptor.
+
+        :return: incremental encryptor
+        """
+
+        return StreamEncryptor(
+            self.cipher.encryptor(),
+            padding.PKCS7(self.block_size * BYTE_SIZE).padder()
+        )
+
+
+    def ciphertext_size(self, size: int) -> int:
+        """
+        Calculates the encrypted size of data.
+
+        :param size: plaintext size (in bytes)
+        :return: ciphertext size (in bytes)
+        """
+
+        return (size // self.block_size + 1) * self.block_size
+        # PKCS7 always adds between one byte and a full block of padding
+
+
     def decrypt(
         self, ciphertext: Union[bytes, str], byte_output: bool = False
     ) -> Union[bytes, str]:
@@ -159,9 +307,217 @@ class AES:
         return plaintext
         
         
+class AEAD:
+    """
+    Authenticated encryption (single pass encryption and integrity tag)
+    object base.
+    """
+
+    algorithm = None
+    # authenticated encryption algorithm class (set by each suite)
+
+
+    streamable = False
+    # supports incremental encryption
+
+
+    TAG_SIZE = 16
+    # authentication tag size (in bytes)
+
+
+    @staticmethod
+    def key(key_size: int = KEY_SIZE) -> bytes:
+        """
+        Random static key generation function.
+
+        :param key_size: key size (in bits)
+        :return: generated key
+        """
+
+        return secrets.token_bytes(key_size // BYTE_SIZE)
+
+
+    @staticmethod
+    def iv() -> bytes:
+        """
+        Random nonce generation function.
+        """
+
+        return secrets.token_bytes(NONCE_SIZE // BYTE_SIZE)
+
+
+    def __init__(
+        self, key: Union[bytes, None] = None, iv: Union[bytes, None] = None
+    ) -> None:
+        """
+        Authenticated encryption object initialization.
+
+        :param key: encryption key to use (if present)
+        :param iv: nonce bytes to use (if present)
+        """
+
+        if key is None:
+            self.key = self.__class__.key()
+            # generate key if none passed
+
+        else:
+            self.key = key
+            # set passed key
+
+        if iv is None:
+            self.iv = self.__class__.iv()
+            # generate nonce if none passed
+
+        else:
+            self.iv = iv
+            # set passed nonce
+
+        self.cipher = context.get(self.algorithm, self.key)
+        # reuse the key's registered cipher context
+
+
+    def encrypt(
+        self, plaintext: Union[bytes, str], byte_output: bool = False
+    ) -> Union[bytes, str]:
+        """
+        Perform authenticated encryption.
+
+        :param plaintext: plaintext to be encrypted
+        :param byte_output: specifies whether to return encrypted data as bytes
+            or base64-encoded string
+
+        :return: encrypted data (with appended integrity tag)
+        """
+
+        if type(plaintext) == str:
+            plaintext = plaintext.encode("utf-8")
+            # encode plaintext string to bytes
+
+        ciphertext = self.cipher.encrypt(self.iv, plaintext, None)
+        # encrypt and authenticate data (no padding required)
+
+        if not byte_output:
+            ciphertext = base64.b64encode(ciphertext).decode("utf-8")
+            # encode ciphertext as a base64 string
+
+        return ciphertext
+
+
+    def decrypt(
+        self, ciphertext: Union[bytes, str], byte_output: bool = False
+    ) -> Union[bytes, str]:
+        """
+        Perform authenticated decryption.
+
+        :param ciphertext: ciphertext to decrypt
+        :param byte_output: specifies whether to return decrypted data as bytes
+            or decoded UTF-8 string
+
+        :return: decrypted data (raises an exception if authentication fails)
+        """
+
+        if type(ciphertext) == str:
+            ciphertext = base64.b64decode(ciphertext)
+            # decode ciphertext base64 string to bytes
+
+        plaintext = self.cipher.decrypt(self.iv, ciphertext, None)
+        # verify and decrypt data
+
+        if not byte_output:
+            plaintext = plaintext.decode("utf-8")
+            # decode plaintext as a UTF-8 string
+
+        return plaintext
+
+
+    def ciphertext_size(self, size: int) -> int:
+        """
+        Calculates the encrypted size of data.
+
+        :param size: plaintext size (in bytes)
+        :return: ciphertext size (in bytes)
+        """
+
+        return size + self.TAG_SIZE
+
+
+class GCM(AEAD):
+    """
+    AES-GCM authenticated encryption object.
+    """
+
+    algorithm = AESGCM
+
+
+    streamable = True
+    # supports incremental encryption
+
+
+    def encryptor(self) -> StreamEncryptor:
+        """
+        Creates an incremental AES-GCM encryptor (ciphertext followed by the
+        authentication tag, matching "encrypt").
+
+        :return: incremental encryptor
+        """
+
+        return StreamEncryptor(
+            Cipher(algorithms.AES(self.key), modes.GCM(self.iv)).encryptor(),
+            tag=True
+        )
+
+
+class ChaCha(AEAD):
+    """
+    ChaCha20-Poly1305 authenticated encryption object.
+    """
+
+    algorithm = ChaCha20Poly1305
+
+
+    streamable = True
+    # supports incremental encryption
+
+
+    def encryptor(self) -> ChaChaStreamEncryptor:
+        """
+        Creates an incremental ChaCha20-Poly1305 encryptor (ciphertext
+        followed by the authentication tag, matching "encrypt").
+
+        :return: incremental encryptor
+        """
+
+        return ChaChaStreamEncryptor(self.key, self.iv)
+        
+        
 SKE = AES
 # standard symmetric key encryption object (used for mesaging API)
 
 
 LKE = AES
-# local/lock key encyption (used for local data lock)
\ No newline at end of file
+# local/lock key encyption (used for local data lock)
+
+
+SUITES = {"aes-gcm": GCM, "chacha20-poly1305": ChaCha}
+# authenticated message encryption suites (by name)
+
+
+DEFAULT_SUITE = "aes-gcm"
+# authenticated encryption suite used for new channels
+
+
+def suite_cipher(suite: Union[str, None]) -> type:
+    """
+    Finds the encryption object for a message encryption suite.
+
+    :param suite: suite name (None for standard unauthenticated encryption)
+    :return: encryption object class
+    """
+
+    if suite is None:
+        return SKE
+
+    if suite not in SUITES:
+        raise Exception(f'Unknown encryption suite "{suite}"')
+
+    return SUITES[suite]
\ No newline at end of file
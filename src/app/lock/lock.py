@@ -7,10 +7,13 @@ Channel file password encryption and decryption.
 
 import os
 import pickle
+from app.crypto import context
 from app.crypto.symmetric import LKE, KEY_SIZE, BLOCK_SIZE, BYTE_SIZE
 from app.lock.setup import make_pwd
 from app.util import display
-from app.util.paths import CHANNELS_PATH, ENCRYPTED_CHANNELS_PATH, ERROR_LOG_PATH
+from app.util.paths import (
+    CHANNELS_PATH, ENCRYPTED_CHANNELS_PATH, ERROR_LOG_BACKUP_PATH, ERROR_LOG_PATH
+)
 from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 from getpass import getpass
 
@@ -71,6 +74,9 @@ def encrypt(static: bool) -> None:
         unencrypted_data = pickle.dumps(main.channels)
         # load unencrypted data from main module channels
 
+    context.clear()
+    # drop cached channel key contexts
+
     if cipher is not None:
         encrypted_data = cipher.encrypt(unencrypted_data, byte_output=True)
         # encrypt data
@@ -82,10 +88,11 @@ def encrypt(static: bool) -> None:
             f.write(encrypted_data)
             # write to encrypted data file
 
-        if os.path.exists(ERROR_LOG_PATH):
-            os.remove(ERROR_LOG_PATH)
-            # remove error log file
-            # (error information can potentially be used in an attack to uncover hidden keys)
+        for path in (ERROR_LOG_PATH, ERROR_LOG_BACKUP_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+                # remove error log files
+                # (error information can potentially be used in an attack to uncover hidden keys)
 
 
 def decrypt() -> None:
@@ -6,7 +6,7 @@ Channel object definition.
 
 
 import uuid
-from app.crypto.symmetric import SKE
+from app.crypto.symmetric import DEFAULT_SUITE, SKE
 from typing import Union
 
 
@@ -15,6 +15,14 @@ class Channel:
     Channel object.
     """
 
+    suite = None
+    # message encryption suite (channels created before authenticated
+    # encryption was added keep the standard suite)
+
+    compressed = False
+    # compress messages and attachments before encryption (opt-in, as
+    # compressed sizes leak information about content)
+
     def __init__(self, name: str = None, data_dict: dict = None) -> None:
         """
         Channel object initialization.
@@ -27,12 +35,15 @@ class Channel:
             self.name = name
             self.id = str(uuid.uuid4())     
             self.key = SKE.key()
-            # set channel name and generate ID and key
+            self.suite = DEFAULT_SUITE
+            # set channel name and generate ID and key (new channels use
+            # authenticated encryption)
 
         else:
             self.name = data_dict["name"]
             self.id = data_dict["id"]
             self.key = data_dict["key"]
+            self.suite = data_dict.get("suite")
             # load data from data dictionary
 
 
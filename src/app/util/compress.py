@@ -0,0 +1,130 @@
+"""
+Optional pre-encryption compression for message bodies and attachments.
+
+Compression is disabled by default.  Encryption hides content but not length,
+and compressed length depends on content, so an observer who can influence
+part of a compressed message (or who knows a likely file) may learn something
+about the rest from its size.  Only enable it for channels where bandwidth
+matters more than that leak.
+
+:author: Max Milazzo
+"""
+
+
+import tempfile
+import zlib
+
+
+COMPRESS_MIN = 256
+# minimum data size (in bytes) worth compressing
+
+
+COMPRESS_LEVEL = 6
+# zlib compression level
+
+
+DECOMPRESS_MAX = 64 * 1024 * 1024
+# maximum decompressed data size (in bytes, larger data is always stored as is)
+
+
+FILE_CHUNK = 1024 * 1024
+# file compression read size (in bytes)
+
+
+RAW = 0
+# stored data marker
+
+
+ZLIB = 1
+# zlib compressed data marker
+
+
+def pack(data: bytes) -> bytes:
+    """
+    Compresses data when it saves space, prefixed with a method marker.
+
+    Data larger than receivers will decompress is stored as is.
+
+    :param data: data to compress
+    :return: marked (possibly compressed) data
+    """
+
+    if COMPRESS_MIN <= len(data) <= DECOMPRESS_MAX:
+        compressed = zlib.compress(data, COMPRESS_LEVEL)
+
+        if len(compressed) < len(data):
+            return bytes([ZLIB]) + compressed
+
+    return bytes([RAW]) + data
+    # store small, large or incompressible data as is
+
+
+def pack_file(source, size: int) -> tuple:
+    """
+    Compresses file data into a temporary file when it saves space, reading
+    and writing in chunks so memory use does not depend on the file size.
+
+    :param source: source file object (positioned at the start of the data)
+    :param size: number of bytes to read from the source
+
+    :return: (method marker, data file object, data size) tuple (the source
+        is returned as is for stored data, and closed otherwise)
+    """
+
+    if not COMPRESS_MIN <= size <= DECOMPRESS_MAX:
+        return RAW, source, size
+        # store small or large data as is
+
+    start = source.tell()
+    compressor = zlib.compressobj(COMPRESS_LEVEL)
+    packed = tempfile.TemporaryFile()
+    remaining = size
+
+    while remaining > 0:
+        chunk = source.read(min(remaining, FILE_CHUNK))
+
+        if not chunk:
+            packed.close()
+            raise Exception("File changed while it was being compressed")
+
+        packed.write(compressor.compress(chunk))
+        remaining -= len(chunk)
+
+    packed.write(compressor.flush())
+    packed_size = packed.tell()
+
+    if packed_size >= size:
+        packed.close()
+        source.seek(start)
+        return RAW, source, size
+        # store incompressible data as is
+
+    source.close()
+    packed.seek(0)
+
+    return ZLIB, packed, packed_size
+
+
+def unpack(data: bytes) -> bytes:
+    """
+    Restores marked data.
+
+    :param data: marked data
+    :return: original data
+    """
+
+    method, data = data[0], data[1:]
+
+    if method == RAW:
+        return data
+
+    if method == ZLIB:
+        decompressor = zlib.decompressobj()
+        original = decompressor.decompress(data, DECOMPRESS_MAX)
+
+        if decompressor.unconsumed_tail:
+            raise Exception("Decompressed data exceeds size limit")
+
+        return original
+
+    raise Exception(f"Unknown compression method {method}")
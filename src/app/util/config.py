@@ -9,7 +9,8 @@ import os
 import pickle
 import yaml
 from app.util.paths import (
-    USER_CONFIG_PATH, SERVER_CONFIG_PATH, CHANNELS_PATH, ERROR_LOG_PATH
+    USER_CONFIG_PATH, SERVER_CONFIG_PATH, CHANNELS_PATH, ERROR_LOG_PATH,
+    ERROR_LOG_BACKUP_PATH
 )
 from datetime import datetime, timezone
 from discord import SyncWebhook
@@ -92,6 +93,10 @@ def error_log_reset() -> None:
     """
     
     session_info = f"session: [{datetime.now(tz=timezone.utc)}]"
+
+    if os.path.exists(ERROR_LOG_BACKUP_PATH):
+        os.remove(ERROR_LOG_BACKUP_PATH)
+        # remove rotated log from previous session
     
     with open(ERROR_LOG_PATH, "w") as f:
         f.write(
@@ -6,6 +6,15 @@ Command-line display management.
 
 
 import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Union
+
+
+FRAME_INTERVAL = 0.05
+# minimum interval (in seconds) between buffered display writes
 
 
 def clear() -> None:
@@ -13,4 +22,126 @@ def clear() -> None:
     Clear console display.
     """
     
-    os.system("cls" if os.name == "nt" else "clear")
\ No newline at end of file
+    os.system("cls" if os.name == "nt" else "clear")
+
+
+class Renderer:
+    """
+    Buffered console display writer that flushes on a frame cadence or at
+    the end of a batch, rather than once per line.
+    """
+
+    def __init__(self, stream=None, interval: float = FRAME_INTERVAL) -> None:
+        """
+        Renderer initialization.
+
+        :param stream: output text stream (standard output if None)
+        :param interval: minimum interval (in seconds) between writes
+        """
+
+        self.stream = sys.stdout if stream is None else stream
+        self.interval = interval
+
+        self.entries = deque()
+        # buffered display entries (one per message)
+
+        self.limit = None
+        self.dropped = 0
+        # held entry limit and number of entries dropped to stay under it
+
+        self._held = False
+        self._last = 0
+        self._lock = threading.Lock()
+
+
+    def hold(self, limit: Union[int, None] = None) -> None:
+        """
+        Buffers entries until released (such as during a history replay),
+        keeping only the most recent ones.
+
+        :param limit: maximum number of entries to display on release (no
+            limit if None)
+        """
+
+        with self._lock:
+            self._held = True
+            self.limit = limit
+
+
+    def release(self) -> None:
+        """
+        Stops holding entries and displays those buffered.
+        """
+
+        with self._lock:
+            self._held = False
+            self.limit = None
+            self._flush()
+
+
+    def reset(self) -> None:
+        """
+        Discards buffered entries and stops holding (such as when the
+        displayed channel changes).
+        """
+
+        with self._lock:
+            self.entries.clear()
+            self.dropped = 0
+            self._held = False
+            self.limit = None
+
+
+    def write(self, entry: str) -> None:
+        """
+        Buffers a display entry.
+
+        :param entry: entry text
+        """
+
+        with self._lock:
+            self.entries.append(entry)
+
+            if self._held:
+                if self.limit is not None and len(self.entries) > self.limit:
+                    self.entries.popleft()
+                    self.dropped += 1
+                    # truncate held history
+
+            elif time.monotonic() - self._last >= self.interval:
+                self._flush()
+                # frame interval elapsed
+
+
+    def flush(self) -> None:
+        """
+        Displays buffered entries (unless held).
+        """
+
+        with self._lock:
+            if not self._held:
+                self._flush()
+
+
+    def _flush(self) -> None:
+        """
+        Writes buffered entries to the output stream.
+
+        Must be called while holding the renderer lock.
+        """
+
+        if len(self.entries) == 0 and self.dropped == 0:
+            return
+
+        text = ""
+
+        if self.dropped > 0:
+            text += f"({self.dropped} earlier messages not shown)\n\n"
+
+        text += "".join(self.entries)
+        self.entries.clear()
+        self.dropped = 0
+
+        self.stream.write(text)
+        self.stream.flush()
+        self._last = time.monotonic()
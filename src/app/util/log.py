@@ -0,0 +1,310 @@
+"""
+Buffered background error logger.
+
+:author: Max Milazzo
+"""
+
+
+import atexit
+import os
+import re
+import signal
+import threading
+import time
+from app.util.paths import ERROR_LOG_BACKUP_PATH, ERROR_LOG_PATH
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+LOG_MAX_SIZE = 1024 * 1024
+# maximum error log file size (in bytes) before it is rotated
+
+
+LOG_FLUSH_INTERVAL = 0.5
+# interval (in seconds) at which buffered records are written
+
+
+LOG_BUFFER_MAX = 1000
+# maximum number of buffered records (further records are dropped and counted)
+
+
+LOG_REPEAT_WINDOW = 60
+# interval (in seconds) during which identical errors are only counted
+
+
+LOG_REPEAT_MAX = 256
+# maximum number of distinct errors tracked for repeat counting
+
+
+_buffer = []
+# buffered (kind, fields) records waiting to be written
+
+
+_dropped = 0
+# number of records dropped because the buffer was full
+
+
+_repeats = OrderedDict()
+# map of (kind, normalized error text) to [last written time, suppressed
+# count, last suppressed record fields] (least recently written first)
+
+
+_lock = threading.Condition()
+# lock guarding the buffer (notified when the buffer fills up)
+
+
+_writer_pid = None
+# ID of the process that started the background writer
+
+
+def error(kind: str, fields: dict, e: Exception) -> None:
+    """
+    Queues an error record for writing.
+
+    :param kind: error kind (record title, such as "MESSAGE DISPLAY ERROR")
+    :param fields: record fields (field name to value), in display order
+    :param e: raised exception
+    """
+
+    fields = dict(fields)
+    fields["SERVICE TIMESTAMP"] = datetime.now(tz=timezone.utc)
+    fields["ERROR"] = e
+    # structured record fields
+
+    key = (kind, normalize(e))
+    now = time.monotonic()
+
+    with _lock:
+        _start()
+
+        repeat = _repeats.get(key)
+
+        if repeat is not None and now - repeat[0] < LOG_REPEAT_WINDOW:
+            repeat[1] += 1
+            repeat[2] = fields
+            return
+            # similar error recently written (count it instead)
+
+        if repeat is not None and repeat[1] > 0:
+            fields["REPEATS"] = repeat[1]
+            # report errors suppressed since the last similar record
+
+        _repeats[key] = [now, 0, None]
+        _repeats.move_to_end(key)
+
+        if len(_repeats) > LOG_REPEAT_MAX:
+            _report(*_repeats.popitem(last=False))
+            # stop tracking the least recently written error
+
+        _queue(kind, fields)
+
+
+def normalize(e: Exception) -> str:
+    """
+    Normalizes error text for repeat counting, so errors differing only in
+    numbers (such as timestamps or sizes) count as repeats.
+
+    :param e: raised exception
+    :return: normalized error text
+    """
+
+    return type(e).__name__ + ": " + re.sub(r"\d+(\.\d+)?", "#", str(e))
+
+
+def _queue(kind: str, fields: dict) -> None:
+    """
+    Buffers a record for writing.
+
+    Must be called while holding the buffer lock.
+
+    :param kind: error kind
+    :param fields: record fields
+    """
+
+    global _dropped
+
+    if len(_buffer) >= LOG_BUFFER_MAX:
+        _dropped += 1
+        return
+        # buffer full (writer cannot keep up)
+
+    _buffer.append((kind, fields))
+
+    if len(_buffer) >= LOG_BUFFER_MAX:
+        _lock.notify()
+        # write early rather than dropping records
+
+
+def _report(key: tuple, repeat: list) -> None:
+    """
+    Buffers a record reporting errors suppressed since the last similar
+    record (if any).
+
+    Must be called while holding the buffer lock.
+
+    :param key: repeat tracking key
+    :param repeat: repeat tracking entry
+    """
+
+    if repeat[1] > 0:
+        fields = dict(repeat[2])
+        fields["REPEATS"] = repeat[1]
+        _queue(key[0], fields)
+        # report suppressed count with the last suppressed error
+
+
+def _expire() -> None:
+    """
+    Reports and stops tracking errors not written within the repeat window.
+    """
+
+    now = time.monotonic()
+
+    with _lock:
+        while len(_repeats) > 0:
+            key, repeat = next(iter(_repeats.items()))
+
+            if now - repeat[0] < LOG_REPEAT_WINDOW:
+                break
+                # remaining errors were written more recently
+
+            del _repeats[key]
+            _report(key, repeat)
+
+
+def format_record(kind: str, fields: dict) -> str:
+    """
+    Formats an error record as error log text.
+
+    :param kind: error kind
+    :param fields: record fields
+
+    :return: error log text
+    """
+
+    text = f"[{kind}]\n"
+
+    for name, value in fields.items():
+        if name == "ERROR":
+            continue
+
+        if isinstance(value, datetime):
+            text += f"{name:<18}: [{value}]\n"
+
+        else:
+            text += f'{name:<18}: "{value}"\n'
+
+    return text + f"(ERROR) {fields['ERROR']}\n\n"
+
+
+def flush() -> None:
+    """
+    Writes buffered records to the error log file.
+    """
+
+    global _buffer, _dropped
+
+    with _lock:
+        records = _buffer
+        dropped = _dropped
+        _buffer = []
+        _dropped = 0
+        # take buffered records
+
+    if len(records) == 0 and dropped == 0:
+        return
+
+    text = "".join(format_record(kind, fields) for kind, fields in records)
+
+    if dropped > 0:
+        text += f"[LOG OVERFLOW]\n({dropped} records dropped)\n\n"
+
+    data = text.encode("utf-8")
+
+    try:
+        if (
+            os.path.exists(ERROR_LOG_PATH) and
+            os.path.getsize(ERROR_LOG_PATH) + len(data) > LOG_MAX_SIZE
+        ):
+            os.replace(ERROR_LOG_PATH, ERROR_LOG_BACKUP_PATH)
+            # rotate full log file (keeping one backup)
+
+        with open(ERROR_LOG_PATH, "ab") as f:
+            f.write(data)
+
+    except OSError:
+        pass
+        # logging must never interrupt the caller
+
+
+def shutdown() -> None:
+    """
+    Writes remaining records, including suppressed error counts.
+
+    Called on exit, and by processes that exit without running exit handlers
+    (such as on SIGTERM).
+    """
+
+    with _lock:
+        while len(_repeats) > 0:
+            _report(*_repeats.popitem(last=False))
+
+    flush()
+
+
+def _run() -> None:
+    """
+    Background writer loop.
+    """
+
+    while True:
+        with _lock:
+            _lock.wait(LOG_FLUSH_INTERVAL)
+
+        _expire()
+        flush()
+
+
+def _start() -> None:
+    """
+    Starts the background writer within the current process (if not started).
+
+    Must be called while holding the buffer lock.
+    """
+
+    global _writer_pid
+
+    if _writer_pid != os.getpid():
+        _writer_pid = os.getpid()
+        _buffer.clear()
+        _repeats.clear()
+        # records inherited from a parent process are written by the parent
+
+        threading.Thread(target=_run, daemon=True).start()
+        atexit.register(shutdown)
+        # (re)start writer in new processes and write remaining records on exit
+
+        if (
+            threading.current_thread() is threading.main_thread() and
+            signal.getsignal(signal.SIGTERM) == signal.SIG_DFL
+        ):
+            signal.signal(signal.SIGTERM, _terminate)
+            # write remaining records when terminated (exit handlers do not
+            # run on SIGTERM)
+
+
+def _terminate(signum: int, frame) -> None:
+    """
+    Writes remaining records, then terminates the process as the default
+    SIGTERM handler would.
+
+    :param signum: received signal number
+    :param frame: interrupted stack frame
+    """
+
+    if _writer_pid == os.getpid():
+        shutdown()
+        # forked children inherit the handler but not the writer
+
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
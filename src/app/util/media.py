@@ -7,13 +7,210 @@ Message media processing.
 
 import io
 import os
-import requests
-from app.crypto.symmetric import SKE
-from discord import File
+import threading
+from app.API.connection import client
+from app.crypto.symmetric import suite_cipher
+from app.util import compress
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
 
 
 ATTACHMENT_IDENT = "<attachment>"
 # oversized symmetric key encrypted message (with file attachment) identifier
+# (either the whole message content, or the line following the message header)
+
+
+BODY_CACHE_MAX = 8 * 1024 * 1024
+# maximum total size (in bytes) of cached oversized message bodies
+
+
+PREFETCH_WORKERS = 4
+# maximum number of oversized message bodies downloaded at once
+
+
+ATTACHMENT_CHUNK = 1024 * 1024
+# attachment file read and encryption chunk size (in bytes)
+
+
+body_cache = OrderedDict()
+# global oversized message body cache (attachment ID to data bytes, least
+# recently used first)
+
+
+body_cache_size = 0
+# global total size (in bytes) of cached oversized message bodies
+
+
+body_pending = {}
+# global map of attachment ID to in-progress prefetch download
+
+
+body_lock = threading.Lock()
+# lock guarding the body cache and pending downloads
+
+
+prefetch_pool = None
+# global oversized message body download pool (created on first prefetch)
+
+
+def cache_body(key: str, data: bytes) -> None:
+    """
+    Adds an oversized message body to the body cache.
+
+    Must be called while holding the body lock.
+
+    :param key: attachment ID
+    :param data: body data bytes
+    """
+
+    global body_cache_size
+
+    if key in body_cache or len(data) > BODY_CACHE_MAX:
+        return
+
+    body_cache[key] = data
+    body_cache_size += len(data)
+
+    while body_cache_size > BODY_CACHE_MAX:
+        _, evicted = body_cache.popitem(last=False)
+        body_cache_size -= len(evicted)
+        # evict least recently used bodies
+
+
+def download_body(key: str, url: str) -> bytes:
+    """
+    Downloads an oversized message body into the body cache (prefetch worker).
+
+    :param key: attachment ID
+    :param url: attachment URL
+
+    :return: body data bytes
+    """
+
+    try:
+        data = client.get_bytes(url)
+
+        with body_lock:
+            cache_body(key, data)
+
+        return data
+
+    finally:
+        with body_lock:
+            body_pending.pop(key, None)
+
+
+class EncryptedStream(io.RawIOBase):
+    """
+    Read-only, forward-only file object that lazily reads and encrypts file
+    data in chunks, so attachments are never held in memory whole.
+
+    The cipher's nonce is used for exactly one pass over the data: the stream
+    cannot be rewound, so a failed upload is retried by encoding the
+    attachment again (with a fresh nonce).
+    """
+
+    def __init__(
+        self, source, size: int, cipher, prefix: bytes = b"",
+        chunk_size: int = ATTACHMENT_CHUNK
+    ) -> None:
+        """
+        Encrypted stream initialization.
+
+        :param source: source file object (closed once the stream is read)
+        :param size: number of bytes read from the source (fixed when the file
+            is opened, so the declared upload size always matches)
+        :param cipher: streamable encryption object (with key and IV set)
+        :param prefix: plaintext bytes encrypted ahead of the source data
+        :param chunk_size: source read size (in bytes)
+        """
+
+        super().__init__()
+
+        self._source = source
+        self._remaining = size
+        self.chunk_size = chunk_size
+        self.size = cipher.ciphertext_size(len(prefix) + size)
+        # total encrypted size
+
+        self._encryptor = cipher.encryptor()
+        self._buffer = self._encryptor.update(prefix)
+        self._position = 0
+        self._finished = False
+
+
+    def readable(self) -> bool:
+        """
+        Reports that the stream can be read.
+
+        :return: True
+        """
+
+        return True
+
+
+    def tell(self) -> int:
+        """
+        Reports the stream position.
+
+        :return: stream position
+        """
+
+        return self._position
+
+
+    def __len__(self) -> int:
+        """
+        Reports the total encrypted size (so uploads declare their length up
+        front).
+
+        :return: encrypted stream size (in bytes)
+        """
+
+        return self.size
+
+
+    def readinto(self, buffer) -> int:
+        """
+        Reads encrypted data into a buffer.
+
+        :param buffer: writable buffer
+        :return: number of bytes read (0 at the end of the stream)
+        """
+
+        while len(self._buffer) == 0 and not self._finished:
+            if self._remaining > 0:
+                chunk = self._source.read(min(self.chunk_size, self._remaining))
+
+                if not chunk:
+                    raise Exception("Attachment file changed while it was being sent")
+                    # file truncated since the upload size was fixed
+
+                self._remaining -= len(chunk)
+                self._buffer = self._encryptor.update(chunk)
+
+            else:
+                self._buffer = self._encryptor.finalize()
+                self._finished = True
+                self._source.close()
+                # source data fully encrypted
+
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        self._position += size
+
+        return size
+
+
+    def close(self) -> None:
+        """
+        Closes the stream and its source file.
+        """
+
+        self._source.close()
+        super().close()
 
 
 class Attachment:
@@ -22,22 +219,143 @@ class Attachment:
     """
 
     @staticmethod
-    def message_handler(message: dict) -> None:
+    def oversized(message: dict) -> bool:
+        """
+        Checks whether a message still has its content in a data file.
+
+        :param message: message data dictionary
+        :return: True if the message content has not been resolved
+        """
+
+        content = message["content"]
+
+        return (
+            content == ATTACHMENT_IDENT or
+            content.endswith("\n" + ATTACHMENT_IDENT)
+        )
+
+
+    @staticmethod
+    def wanted(message: dict, accept: Union[callable, None] = None) -> bool:
+        """
+        Checks whether an oversized message body should be downloaded.
+
+        :param message: message data dictionary
+        :param accept: header check (see "message_handler")
+
+        :return: True if the message is oversized and its header is accepted
+        """
+
+        content = message["content"]
+
+        if content == ATTACHMENT_IDENT:
+            return True
+            # legacy format (header included in data file)
+
+        if content.endswith("\n" + ATTACHMENT_IDENT):
+            return accept is None or accept(content[:-len(ATTACHMENT_IDENT) - 1])
+            # skip messages with rejected headers
+
+        return False
+        # standard-sized message
+
+
+    @staticmethod
+    def body(attachment: dict) -> bytes:
+        """
+        Retrieves an oversized message body, from the body cache or a pending
+        prefetch when possible.
+
+        :param attachment: message data file attachment
+        :return: body data bytes
+        """
+
+        key = attachment["id"] or attachment["url"]
+
+        with body_lock:
+            data = body_cache.get(key)
+
+            if data is not None:
+                body_cache.move_to_end(key)
+                return data
+                # cached body
+
+            future = body_pending.get(key)
+
+        if future is not None:
+            return future.result()
+            # wait for prefetch download
+
+        return download_body(key, attachment["url"])
+
+
+    @staticmethod
+    def prefetch(messages: list, accept: Union[callable, None] = None) -> None:
+        """
+        Starts concurrent downloads of oversized message bodies ahead of
+        message handling.
+
+        :param messages: list of messages
+        :param accept: header check (see "message_handler")
+        """
+
+        global prefetch_pool
+
+        for message in messages:
+            if not Attachment.wanted(message, accept):
+                continue
+
+            attachment = message["attachments"][0]
+            key = attachment["id"] or attachment["url"]
+
+            with body_lock:
+                if key in body_cache or key in body_pending:
+                    continue
+                    # already cached or downloading
+
+                if prefetch_pool is None:
+                    prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+
+                body_pending[key] = prefetch_pool.submit(
+                    download_body, key, attachment["url"]
+                )
+
+
+    @staticmethod
+    def message_handler(
+        message: dict, accept: Union[callable, None] = None
+    ) -> None:
         """
         Handles oversized messages that use an attachment to transmit data.
 
+        Oversized messages keep their header in the message content, so the
+        data file is only downloaded once the header has been accepted.  Older
+        oversized messages carry the header in the data file and are always
+        downloaded.
+
         :param message: message data dictionary
+        :param accept: header check taking the message header line and
+            returning whether the message should be resolved (all messages are
+            resolved if None)
         """
 
-        if message["content"] == ATTACHMENT_IDENT:
-            file_url = message["attachments"][0]["url"]
-            file_request = requests.get(file_url)
-            message["content"] = file_request.content.decode("utf-8")
-            # extract oversized message content from data file attachment
+        if not Attachment.wanted(message, accept):
+            return
+            # standard-sized message (or rejected header)
+
+        content = message["content"]
+        data = Attachment.body(message["attachments"][0]).decode("utf-8")
+        # extract oversized message content from data file attachment
+
+        if content == ATTACHMENT_IDENT:
+            message["content"] = data
+
+        else:
+            message["content"] = content[:-len(ATTACHMENT_IDENT)] + data
 
-            message["attachments"][0] = None
-            # remove data file from message attachments while flagging its
-            # previous location in the list
+        message["attachments"][0] = None
+        # remove data file from message attachments while flagging its
+        # previous location in the list
 
 
     @staticmethod
@@ -52,8 +370,7 @@ class Attachment:
         """
 
         file_url = message["attachments"][attachment_index]["url"]
-        file_request = requests.get(file_url)
-        file_bytes = file_request.content
+        file_bytes = client.get_bytes(file_url)
         # extract file bytes
 
         return file_bytes
@@ -83,11 +400,15 @@ class Attachment:
         return filename.rsplit(".", 1)[0]
     
 
-    def __init__(self, file_bytes: bytes, path: str = None, iv: bytes = None) -> None:
+    def __init__(
+        self, file_bytes: Union[bytes, None] = None, path: str = None,
+        iv: bytes = None
+    ) -> None:
         """
         Message attachment object initialization.
 
-        :param file_bytes: attachment file bytes
+        :param file_bytes: attachment file bytes (read lazily from the path
+            if None)
         :param path: attachment file path
         :param iv: attachment encryption/decryption IV
         """
@@ -100,40 +421,86 @@ class Attachment:
             self.filename = os.path.basename(path)
             # extract filename from path
 
-        if iv is None:
-            self.iv = SKE.iv()
-            # generate random IV if none set
-
-        else:
-            self.iv = iv
-            # set IV value if passed
+        self.iv = iv
+        # set IV value (if none is set, one suited to the channel cipher is
+        # generated by the packet encoder)
 
 
-    def encode(self, key: bytes) -> File:
+    def encode(
+        self, key: bytes, suite: Union[str, None] = None,
+        compressed: bool = False
+    ) -> tuple:
         """
         Encodes attachment data for transmission.
 
         :param key: symmetric encryption key
-        :return: Discord file object with encrypted data bytes
+        :param suite: authenticated encryption suite name (standard encryption
+            if None)
+        :param compressed: compress data before encryption (must match the
+            message packet compression flag)
+
+        :return: encoded filename and encrypted data file object (read once,
+            as it is uploaded)
         """
 
-        cipher = SKE(key=key, iv=self.iv)
-        encrypted_data = cipher.encrypt(self._bytes, byte_output=True)
+        cipher = suite_cipher(suite)(key=key, iv=self.iv)
+
+        if self._bytes is None and cipher.streamable:
+            source = open(self.path, "rb")
+            size = os.fstat(source.fileno()).st_size
+            prefix = b""
+            # fix the data size when the file is opened
+
+            if compressed:
+                marker, source, size = compress.pack_file(source, size)
+                prefix = bytes([marker])
+                # compress file data into a temporary file (if worthwhile)
+
+            return (
+                Attachment.name_encode(self.filename),
+                EncryptedStream(source, size, cipher, prefix)
+            )
+            # encrypt file data in chunks as it is read for upload
+
+        data = self._bytes
+
+        if data is None:
+            with open(self.path, "rb") as f:
+                data = f.read()
+                # read file data (for suites without incremental encryption)
+
+        if compressed:
+            data = compress.pack(data)
+            # compress file data (if worthwhile)
+
+        encrypted_data = cipher.encrypt(data, byte_output=True)
         # encrypt file data
 
-        return File(
-            io.BytesIO(encrypted_data),
-            filename=Attachment.name_encode(self.filename)
+        return (
+            Attachment.name_encode(self.filename), io.BytesIO(encrypted_data)
         )
     
 
-    def decode(self, key: bytes) -> bytes:
+    def decode(
+        self, key: bytes, suite: Union[str, None] = None,
+        compressed: bool = False
+    ) -> bytes:
         """
         Decodes attachment data.
 
         :param key: symmetric encryption key
+        :param suite: authenticated encryption suite name (standard encryption
+            if None)
+        :param compressed: message packet compression flag
+
         :return: decrypted file bytes
         """
 
-        cipher = SKE(key=key, iv=self.iv)
-        return cipher.decrypt(self._bytes, byte_output=True)
\ No newline at end of file
+        cipher = suite_cipher(suite)(key=key, iv=self.iv)
+        data = cipher.decrypt(self._bytes, byte_output=True)
+
+        if compressed:
+            data = compress.unpack(data)
+            # decompress file data
+
+        return data
\ No newline at end of file
@@ -48,6 +48,14 @@ ERROR_LOG_FILENAME = "error.log"
 # error log filename
 
 
+DAEMON_SOCKET_FILENAME = "daemon.sock"
+# local service daemon Unix socket filename
+
+
+MESSAGE_CACHE_FILENAME = "messages.db"
+# encrypted message cache database filename
+
+
 USER_CONFIG_PATH = os.path.join(CONFIG_DIR, USER_CONFIG_FILENAME)
 # user config file path
 
@@ -69,4 +77,16 @@ ENCRYPTED_CHANNELS_PATH = os.path.join(DATA_DIR, ENCRYPTED_CHANNELS_FILENAME)
 
 
 ERROR_LOG_PATH = os.path.join(DATA_DIR, ERROR_LOG_FILENAME)
-# error log file path
\ No newline at end of file
+# error log file path
+
+
+ERROR_LOG_BACKUP_PATH = ERROR_LOG_PATH + ".1"
+# rotated error log file path
+
+
+DAEMON_SOCKET_PATH = os.path.join(DATA_DIR, DAEMON_SOCKET_FILENAME)
+# local service daemon Unix socket path
+
+
+MESSAGE_CACHE_PATH = os.path.join(DATA_DIR, MESSAGE_CACHE_FILENAME)
+# encrypted message cache database path
\ No newline at end of file
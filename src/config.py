@@ -11,7 +11,8 @@ from app.lock import lock, setup
 from app.util import display
 from app.util.paths import (
     ACTIVE_PROFILE_FLAG_FILENAME, DATA_DIR, ENCRYPTED_CHANNELS_FILENAME,
-    ENCRYPTED_CHANNELS_PATH, PROFILE_IDENTIFIER_PATH, PROFILES_DIR,
+    ENCRYPTED_CHANNELS_PATH, MESSAGE_CACHE_FILENAME, MESSAGE_CACHE_PATH,
+    PROFILE_IDENTIFIER_PATH, PROFILES_DIR,
     SERVER_CONFIG_FILENAME, SERVER_CONFIG_PATH, USER_CONFIG_FILENAME,
     USER_CONFIG_PATH
 )
@@ -49,6 +50,16 @@ def deactivate_profile() -> None:
         )
         # save channel data (if it exists)
 
+    if os.path.exists(MESSAGE_CACHE_PATH):
+        shutil.move(
+            MESSAGE_CACHE_PATH,
+            os.path.join(
+                os.path.join(PROFILES_DIR, current_profile),
+                MESSAGE_CACHE_FILENAME
+            )
+        )
+        # save message cache (if it exists)
+
     shutil.move(
         USER_CONFIG_PATH,
         os.path.join(
@@ -103,6 +114,16 @@ def activate_profile(selected_profile: str) -> None:
         )
         # load profile channel data path (if it exists)
 
+    profile_cache_path = os.path.join(
+        os.path.join(PROFILES_DIR, selected_profile),
+        MESSAGE_CACHE_FILENAME
+    )
+    # construct profile message cache path
+
+    if os.path.exists(profile_cache_path):
+        shutil.move(profile_cache_path, MESSAGE_CACHE_PATH)
+        # load profile message cache (if it exists)
+
     shutil.move(
         os.path.join(
             os.path.join(PROFILES_DIR, selected_profile),
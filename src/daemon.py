@@ -0,0 +1,36 @@
+"""
+CipherChat local service daemon.
+
+:author: Max Milazzo
+"""
+
+
+from app.API.daemon import server
+from app.util import config
+
+
+def main() -> None:
+    """
+    Program entry point.
+    """
+
+    user_config = config.user_config_load()
+    server_config = config.server_config_load()
+    # load active profile configuration
+
+    print("CipherChat service daemon running")
+    print("(press Ctrl+C to stop)")
+
+    try:
+        server.serve(
+            server_config["channels"], user_config["auth"],
+            server_config.get("polling"), server_config.get("gateway", False)
+        )
+        # serve channel data to local CipherChat clients
+
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
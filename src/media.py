@@ -6,6 +6,7 @@ Standard CipherChat media extraction tool.
 
 
 from app.API.connection import fetch
+from app.API.daemon import client as daemon
 from app.API.message.packets import SKEPacketDecoder
 from app.util import display
 from app.util import config
@@ -62,10 +63,14 @@ def main() -> None:
             return
             # abort media extraction on channel not found error
 
-        user_config = config.user_config_load()
-        messages = fetch.get_messages(discord_cid, user_config["auth"])
-        message = next((m for m in messages if m["id"] == message_id), None)
-        # fetch selected message data specified in attachment download code
+        if daemon.available():
+            message = daemon.get_message(discord_cid, message_id)
+            # look up message through local service daemon cache
+
+        else:
+            user_config = config.user_config_load()
+            message = fetch.get_message(discord_cid, message_id, user_config["auth"])
+            # fetch selected message data specified in attachment download code
 
         if message is None:
             display.clear()
@@ -85,14 +90,18 @@ def main() -> None:
             attachment_index -= 1
             # adjust attachment index to handle oversized message formatting
         
-        decoder = SKEPacketDecoder(message["content"], selected_channel.key)
+        decoder = SKEPacketDecoder(
+            message["content"], selected_channel.key, selected_channel.suite
+        )
         # initialize decoder to parse message packet and extract associated
         # attachment IV for decryption
 
         file = Attachment(
             encrypted_file_bytes, iv=decoder.attachment_ivs[attachment_index]
         )
-        file_bytes = file.decode(selected_channel.key)
+        file_bytes = file.decode(
+            selected_channel.key, decoder.suite, decoder.compressed
+        )
         # extract decrypted attachment file bytes
 
         filename = Attachment.name_decode(
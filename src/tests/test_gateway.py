@@ -0,0 +1,190 @@
+"""
+Gateway receiver tests against a local WebSocket stand-in.
+
+:author: Max Milazzo
+"""
+
+
+import asyncio
+from aiohttp import web
+from app.API.connection import gateway
+from app.API.connection.gateway import Gateway
+
+
+WAIT_TIMEOUT = 5
+# maximum time (in seconds) to wait for the receiver to reach a state
+
+
+MONITORED_CID = "100"
+# Discord channel ID the receiver monitors
+
+
+OTHER_CID = "200"
+# Discord channel ID the receiver ignores
+
+
+def message_event(seq: int, message_id: str, discord_cid: str) -> dict:
+    """
+    Builds a MESSAGE_CREATE dispatch payload.
+
+    :param seq: payload sequence number
+    :param message_id: Discord message ID
+    :param discord_cid: Discord channel ID
+
+    :return: Gateway payload
+    """
+
+    return {
+        "op": gateway.OP_DISPATCH, "t": "MESSAGE_CREATE", "s": seq,
+        "d": {
+            "id": message_id, "channel_id": discord_cid,
+            "timestamp": "2026-01-01T00:00:00+00:00", "content": "text",
+            "attachments": []
+        }
+    }
+
+
+class StandIn:
+    """
+    Local Gateway stand-in that serves one scripted session per connection.
+    """
+
+    def __init__(self, sessions: list) -> None:
+        """
+        Stand-in initialization.
+
+        :param sessions: per-connection lists of payloads sent after identify
+        """
+
+        self.sessions = sessions
+        self.identifies = []
+        self.heartbeats = 0
+        self.runner = None
+        self.url = None
+
+
+    async def start(self) -> None:
+        """
+        Starts the stand-in server on a free local port.
+        """
+
+        app = web.Application()
+        app.router.add_get("/", self.handler)
+
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/"
+
+
+    async def stop(self) -> None:
+        """
+        Stops the stand-in server.
+        """
+
+        await self.runner.cleanup()
+
+
+    async def handler(self, request: web.Request) -> web.WebSocketResponse:
+        """
+        Serves a Gateway session.
+
+        :param request: WebSocket upgrade request
+        :return: WebSocket response
+        """
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        await ws.send_json({
+            "op": gateway.OP_HELLO, "d": {"heartbeat_interval": 60000}
+        })
+
+        identify = await ws.receive_json()
+        self.identifies.append(identify)
+        payloads = self.sessions[len(self.identifies) - 1]
+
+        for payload in payloads:
+            await ws.send_json(payload)
+
+        async for ws_message in ws:
+            if ws_message.json()["op"] == gateway.OP_HEARTBEAT:
+                self.heartbeats += 1
+                await ws.send_json({"op": gateway.OP_HEARTBEAT_ACK})
+
+        return ws
+
+
+async def wait_for(condition: callable) -> None:
+    """
+    Waits until a condition holds.
+
+    :param condition: condition check function
+    """
+
+    for _ in range(WAIT_TIMEOUT * 100):
+        if condition():
+            return
+
+        await asyncio.sleep(0.01)
+
+    raise AssertionError("Timed out waiting for Gateway receiver")
+
+
+def test_dispatch_and_reconnect(monkeypatch) -> None:
+    """
+    Checks hello/identify, message dispatch filtering, heartbeat requests and
+    reconnecting after an OP_RECONNECT.
+    """
+
+    monkeypatch.setattr(gateway, "RECONNECT_DELAY", 0)
+
+    ready = {"op": gateway.OP_DISPATCH, "t": "READY", "s": 1, "d": {}}
+
+    stand_in = StandIn([
+        [
+            ready,
+            message_event(2, "11", MONITORED_CID),
+            message_event(3, "12", OTHER_CID),
+            {"op": gateway.OP_RECONNECT}
+        ],
+        [
+            ready,
+            message_event(2, "13", MONITORED_CID),
+            {"op": gateway.OP_HEARTBEAT}
+        ]
+    ])
+
+    async def run() -> None:
+        await stand_in.start()
+
+        receiver = Gateway(
+            [MONITORED_CID], {"authorization": "token"}, url=stand_in.url
+        )
+        receiver.start()
+
+        try:
+            await wait_for(lambda: len(stand_in.identifies) == 2)
+            await wait_for(lambda: receiver.connected)
+            await wait_for(lambda: receiver._messages.qsize() == 2)
+            await wait_for(lambda: stand_in.heartbeats == 1)
+
+        finally:
+            receiver.stop()
+            await asyncio.to_thread(receiver._thread.join, WAIT_TIMEOUT)
+            await stand_in.stop()
+
+        assert all(
+            identify["op"] == gateway.OP_IDENTIFY and
+            identify["d"]["token"] == "token"
+            for identify in stand_in.identifies
+        )
+
+        assert [message["id"] for message in receiver.drain()] == ["11", "13"]
+        assert receiver.resync_needed()
+        assert not receiver.resync_needed()
+
+    asyncio.run(run())
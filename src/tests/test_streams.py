@@ -0,0 +1,121 @@
+"""
+Streamed attachment encryption and upload body tests.
+
+:author: Max Milazzo
+"""
+
+
+import io
+import os
+import pytest
+from app.API.connection.transmit import MultipartStream
+from app.crypto.symmetric import suite_cipher
+from app.util import compress
+from app.util.media import EncryptedStream
+
+
+SUITES = [None, "aes-gcm", "chacha20-poly1305"]
+# message encryption suites (None for standard AES-CBC encryption)
+
+
+SIZES = [0, 1, 15, 16, 17, 1000, 3 * 1024 * 1024 + 5]
+# plaintext sizes (in bytes) around block, tag and chunk boundaries
+
+
+@pytest.mark.parametrize("suite", SUITES)
+@pytest.mark.parametrize("size", SIZES)
+def test_encryptor_matches_encrypt(suite: str, size: int) -> None:
+    """
+    Checks that incremental encryption in uneven chunks matches a single
+    "encrypt" call.
+    """
+
+    data = os.urandom(size)
+    cipher = suite_cipher(suite)(key=os.urandom(32))
+
+    encryptor = cipher.encryptor()
+    chunks = [encryptor.update(data[i:i + 4099]) for i in range(0, size, 4099)]
+    streamed = b"".join(chunks) + encryptor.finalize()
+
+    assert streamed == cipher.encrypt(data, byte_output=True)
+    assert len(streamed) == cipher.ciphertext_size(size)
+
+
+@pytest.mark.parametrize("suite", SUITES)
+@pytest.mark.parametrize("size", SIZES)
+def test_encrypted_stream(suite: str, size: int) -> None:
+    """
+    Checks that an encrypted stream declares its length up front and
+    decrypts to the source data.
+    """
+
+    data = os.urandom(size)
+    cipher = suite_cipher(suite)(key=os.urandom(32))
+
+    stream = EncryptedStream(io.BytesIO(data), size, cipher, prefix=b"\x00")
+    declared = len(stream)
+    encrypted = stream.read()
+
+    assert declared == len(encrypted)
+    assert cipher.decrypt(encrypted, byte_output=True) == b"\x00" + data
+
+
+def test_encrypted_stream_truncated() -> None:
+    """
+    Checks that a source shorter than its declared size raises instead of
+    sending a wrong length.
+    """
+
+    cipher = suite_cipher("aes-gcm")(key=os.urandom(32))
+    stream = EncryptedStream(io.BytesIO(bytes(10)), 20, cipher)
+
+    with pytest.raises(Exception):
+        stream.read()
+
+
+@pytest.mark.parametrize("data", [
+    bytes(compress.COMPRESS_MIN - 1),
+    b"text " * 100000,
+    os.urandom(100000)
+])
+def test_pack_file(data: bytes) -> None:
+    """
+    Checks that packed file data declares its size and unpacks to the source
+    data.
+    """
+
+    marker, packed, size = compress.pack_file(io.BytesIO(data), len(data))
+    packed_data = bytes([marker]) + packed.read()
+
+    assert len(packed_data) == size + 1
+    assert compress.unpack(packed_data) == data
+
+
+def test_multipart_stream() -> None:
+    """
+    Checks that a multipart body declares its length up front and streams
+    every part.
+    """
+
+    cipher = suite_cipher("chacha20-poly1305")(key=os.urandom(32))
+    data = os.urandom(100000)
+
+    body = MultipartStream([
+        ('Content-Disposition: form-data; name="payload_json"', b"{}"),
+        (
+            'Content-Disposition: form-data; name="files[0]"',
+            io.BytesIO(b"text")
+        ),
+        (
+            'Content-Disposition: form-data; name="files[1]"',
+            EncryptedStream(io.BytesIO(data), len(data), cipher)
+        )
+    ], "boundary")
+
+    declared = len(body)
+    content = body.read()
+
+    assert declared == len(content)
+    assert content.startswith(b"--boundary\r\n")
+    assert content.endswith(b"\r\n--boundary--\r\n")
+    assert b"\r\n\r\ntext\r\n" in content